@@ -207,49 +207,39 @@ class agilentBaseInfiniium(agilentBaseScope):
         self._channel_input_impedance[index] = value
         self._set_cache_valid(index=index)
     
-    def _measurement_fetch_waveform(self, index):
-        index = ivi.get_index(self._channel_name, index)
-        
-        if self._driver_operation_simulate:
-            return list()
-        
+    def _setup_waveform_transfer(self, index):
         if sys.byteorder == 'little':
             self._write(":waveform:byteorder lsbfirst")
         else:
             self._write(":waveform:byteorder msbfirst")
         self._write(":waveform:format word")
         self._write(":waveform:source %s" % self._channel_name[index])
+    
+    def _read_waveform_preamble(self):
+        trace = ivi.TraceYT()
         
         # Read preamble
-        
         pre = self._ask(":waveform:preamble?").split(',')
         
-        format = int(pre[0])
-        type = int(pre[1])
+        acq_format = int(pre[0])
+        acq_type = int(pre[1])
         points = int(pre[2])
-        count = int(pre[3])
-        xincrement = float(pre[4])
-        xorigin = float(pre[5])
-        xreference = int(float(pre[6]))
-        yincrement = float(pre[7])
-        yorigin = float(pre[8])
-        yreference = int(float(pre[9]))
+        trace.average_count = int(pre[3])
+        trace.x_increment = float(pre[4])
+        trace.x_origin = float(pre[5])
+        trace.x_reference = int(float(pre[6]))
+        trace.y_increment = float(pre[7])
+        trace.y_origin = float(pre[8])
+        trace.y_reference = int(float(pre[9]))
+        trace.y_hole = 31232
         
-        #if type == 1:
+        #if acq_type == 1:
         #    raise scope.InvalidAcquisitionTypeException()
         
-        if format != 2:
-            raise UnexpectedResponseException()
-        
-        # Read waveform data
-        raw_data = self._ask_for_ieee_block(":waveform:data?")
-        
-        # Split out points and convert to time and voltage pairs
-        y_data = array.array('h', raw_data[0:points*2])
-        
-        data = [(((i - xreference) * xincrement) + xorigin, float('nan') if y == 31232 else ((y - yreference) * yincrement) + yorigin) for i, y in enumerate(y_data)]
+        if acq_format != 2:
+            raise ivi.UnexpectedResponseException()
         
-        return data
+        return trace, points, 'h'
     
     def _measurement_read_waveform(self, index, maximum_time):
         return self._measurement_fetch_waveform(index)
@@ -167,6 +167,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
                        scope.ContinuousAcquisition, scope.AverageAcquisition,
                        scope.SampleMode, scope.TriggerModifier, scope.AutoSetup,
                        extra.common.SystemSetup, extra.common.Screenshot,
+                       extra.scope.MemmapWaveform, extra.scope.HostWaveformMeasurement,
                        ivi.Driver):
     "Agilent generic IVI oscilloscope driver"
     
@@ -487,7 +488,10 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
         # reset
         if reset:
             self.utility.reset()
-
+    
+    def _reconnect_init(self):
+        # interface clear
+        self._clear()
     
     def _utility_disable(self):
         pass
@@ -982,8 +986,15 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
     def _get_channel_offset(self, index):
         index = ivi.get_index(self._channel_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            self._channel_offset[index] = float(self._ask(":%s:offset?" % self._channel_name[index]))
-            self._set_cache_valid(index=index)
+            if index < self._analog_channel_count:
+                # read all analog channels in one round trip
+                values = self._ask_pipelined([":%s:offset?" % n for n in self._analog_channel_name])
+                for i, value in enumerate(values):
+                    self._channel_offset[i] = float(value)
+                    self._set_cache_valid(index=i)
+            else:
+                self._channel_offset[index] = float(self._ask(":%s:offset?" % self._channel_name[index]))
+                self._set_cache_valid(index=index)
         return self._channel_offset[index]
     
     def _set_channel_offset(self, index, value):
@@ -997,10 +1008,18 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
     def _get_channel_range(self, index):
         index = ivi.get_index(self._channel_name, index)
         if not self._driver_operation_simulate and not self._get_cache_valid(index=index):
-            self._channel_range[index] = float(self._ask(":%s:range?" % self._channel_name[index]))
-            self._channel_scale[index] = self._channel_range[index] / self._vertical_divisions
-            self._set_cache_valid(index=index)
-            self._set_cache_valid(True, "channel_scale", index)
+            if index < self._analog_channel_count:
+                # read all analog channels in one round trip
+                values = self._ask_pipelined([":%s:range?" % n for n in self._analog_channel_name])
+                indices = range(len(values))
+            else:
+                values = [self._ask(":%s:range?" % self._channel_name[index])]
+                indices = [index]
+            for i, value in zip(indices, values):
+                self._channel_range[i] = float(value)
+                self._channel_scale[i] = self._channel_range[i] / self._vertical_divisions
+                self._set_cache_valid(index=i)
+                self._set_cache_valid(True, "channel_scale", i)
         return self._channel_range[index]
     
     def _set_channel_range(self, index, value):
@@ -1333,12 +1352,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
     def _set_trigger_ac_line_slope(self, value):
         self._set_trigger_edge_slope(value)
     
-    def _measurement_fetch_waveform(self, index):
-        index = ivi.get_index(self._channel_name, index)
-
-        if self._driver_operation_simulate:
-            return ivi.TraceYT()
-
+    def _setup_waveform_transfer(self, index):
         self._write(":waveform:source %s" % self._channel_name[index])
         if sys.byteorder == 'little':
             self._write(":waveform:byteorder lsbfirst")
@@ -1347,6 +1361,7 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
         self._write(":waveform:unsigned 1")
         self._write(":waveform:format word")
 
+    def _read_waveform_preamble(self):
         trace = ivi.TraceYT()
 
         # Read preamble
@@ -1368,16 +1383,48 @@ class agilentBaseScope(scpi.common.IdnCommand, scpi.common.ErrorQuery, scpi.comm
             raise scope.InvalidAcquisitionTypeException()
 
         if acq_format != 1:
-            raise UnexpectedResponseException()
+            raise ivi.UnexpectedResponseException()
+
+        return trace, points, 'H'
+
+    def _measurement_fetch_waveform(self, index):
+        index = ivi.get_index(self._channel_name, index)
+
+        if self._driver_operation_simulate:
+            return ivi.TraceYT()
+
+        self._setup_waveform_transfer(index)
+
+        trace, points, typecode = self._read_waveform_preamble()
 
         # Read waveform data
         raw_data = self._ask_for_ieee_block(":waveform:data?")
         self._read_raw() # flush buffer
 
         # Store in trace object
-        trace.y_raw = array.array('H', raw_data[0:points*2])
+        size = array.array(typecode).itemsize
+        trace.y_raw = array.array(typecode, raw_data[0:points*size])
 
         return trace
+
+    def _measurement_fetch_waveform_memmap(self, index, filename):
+        index = ivi.get_index(self._channel_name, index)
+
+        if self._driver_operation_simulate:
+            return ivi.TraceYT()
+
+        self._setup_waveform_transfer(index)
+
+        trace, points, typecode = self._read_waveform_preamble()
+
+        # Stream waveform data to file
+        self._write(":waveform:data?")
+        with open(filename, 'wb') as f:
+            num = self._read_ieee_block_into(f)
+        self._read_raw() # flush buffer
+
+        size = array.array(typecode).itemsize
+        return ivi.memmap_trace(trace, filename, typecode, min(points, num // size))
     
     def _measurement_read_waveform(self, index, maximum_time):
         return self._measurement_fetch_waveform(index)
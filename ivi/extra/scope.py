@@ -0,0 +1,270 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import numpy as np
+
+from .. import ivi
+
+class MemmapWaveform(ivi.IviContainer):
+    "Extension IVI methods for oscilloscopes supporting waveform transfer into memory-mapped files"
+
+    def __init__(self, *args, **kwargs):
+        super(MemmapWaveform, self).__init__(*args, **kwargs)
+
+        self._add_method('channels[].measurement.fetch_waveform_memmap',
+                        self._measurement_fetch_waveform_memmap,
+                        ivi.Doc("""
+                        Fetches the waveform for the specified channel from a previously
+                        initiated acquisition and stores the raw samples in the specified file
+                        instead of in memory.  The scaling metadata is written to a sidecar
+                        header file with the extension .hdr appended to the file name.
+
+                        The returned trace object is backed by a read-only numpy memmap of the
+                        file, so very deep records can be processed without holding the whole
+                        record in memory.  Slice the trace (trace[a:b]) or trace.y_raw to page
+                        through the data.  The file can be reopened later with
+                        ivi.load_memmap_trace.
+                        """))
+
+    def _measurement_fetch_waveform_memmap(self, index, filename):
+        trace = self._measurement_fetch_waveform(index)
+        y = np.asarray(trace.y_raw)
+        y.tofile(filename)
+        return ivi.memmap_trace(trace, filename, y.dtype, len(y))
+
+
+HostMeasurementFunction = set(['rise_time', 'fall_time', 'frequency', 'period',
+        'voltage_rms', 'voltage_peak_to_peak', 'voltage_max', 'voltage_min',
+        'voltage_high', 'voltage_low', 'voltage_average', 'width_negative',
+        'width_positive', 'duty_cycle_negative', 'duty_cycle_positive',
+        'amplitude', 'voltage_cycle_rms', 'voltage_cycle_average',
+        'overshoot', 'preshoot'])
+
+def _top_base(y, vmin, vmax, bins=256):
+    # voltage high and low from the histogram modes of the upper and
+    # lower halves of each row; falls back to max and min when there is
+    # no clear flat top or base (e.g. sine or triangle waves)
+    n = y.shape[0]
+    rng = vmax - vmin
+    valid = ~np.isnan(y)
+    scale = np.where(rng > 0, (bins - 1) / np.where(rng > 0, rng, 1), 0)
+    b = np.rint((np.where(valid, y, vmin[:, None]) - vmin[:, None]) * scale[:, None]).astype(np.intp)
+    b += (np.arange(n) * bins)[:, None]
+    counts = np.bincount(b[valid], minlength=n*bins).reshape(n, bins)
+    half = bins // 2
+    top_bin = half + np.argmax(counts[:, half:], axis=1)
+    base_bin = np.argmax(counts[:, :half], axis=1)
+    total = np.maximum(valid.sum(axis=1), 1)
+    top_count = counts[np.arange(n), top_bin]
+    base_count = counts[np.arange(n), base_bin]
+    top = np.where(top_count * 20 >= total, vmin + top_bin * rng / (bins - 1), vmax)
+    base = np.where(base_count * 20 >= total, vmin + base_bin * rng / (bins - 1), vmin)
+    return top, base
+
+def _interp(y, rows, i, level):
+    # fractional index where row crosses level between i and i + 1
+    y0 = y[rows, i]
+    y1 = y[rows, i + 1]
+    d = y1 - y0
+    return i + np.where(d != 0, (level[rows] - y0) / np.where(d != 0, d, 1), 0)
+
+def _rising_edges(y, low, middle, high):
+    # locate rising edges with low/high hysteresis; returns row, low,
+    # middle and high reference crossing positions for every edge
+    n, m = y.shape
+    cols = np.arange(m)
+    state = np.where(y >= high[:, None], 1, np.where(y <= low[:, None], -1, 0))
+    last = np.maximum.accumulate(np.where(state != 0, cols, 0), axis=1)
+    state = np.take_along_axis(state, last, axis=1)
+    rows, j = np.nonzero((state[:, :-1] == -1) & (state[:, 1:] == 1))
+    k = last[rows, j]
+    j = j + 1
+    above_mid = np.where(y >= middle[:, None], cols, m)
+    next_mid = np.minimum.accumulate(above_mid[:, ::-1], axis=1)[:, ::-1]
+    mid = next_mid[rows, k]
+    return (rows, _interp(y, rows, k, low), _interp(y, rows, mid - 1, middle),
+            _interp(y, rows, j - 1, high))
+
+def _first(rows, values, n, default=np.nan):
+    out = np.full(n, default)
+    r, i = np.unique(rows, return_index=True)
+    out[r] = values[i]
+    return out
+
+def _last(rows, values, n, default=np.nan):
+    out = np.full(n, default)
+    r, i = np.unique(rows[::-1], return_index=True)
+    out[r] = values[::-1][i]
+    return out
+
+def _first_after(rows, values, after, n):
+    # first value in each row that is greater than after[row]
+    out = np.full(n, np.inf)
+    mask = values > after[rows]
+    np.minimum.at(out, rows[mask], values[mask])
+    out[np.isinf(out)] = np.nan
+    return out
+
+def _measure_block(y, x_increment, functions, levels):
+    n, m = y.shape
+    res = dict()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        vmax = np.nanmax(y, axis=1)
+        vmin = np.nanmin(y, axis=1)
+        top, base = _top_base(y, vmin, vmax)
+        amp = top - base
+        low = base + amp * levels[0] / 100.0
+        middle = base + amp * levels[1] / 100.0
+        high = base + amp * levels[2] / 100.0
+
+        res['voltage_max'] = vmax
+        res['voltage_min'] = vmin
+        res['voltage_peak_to_peak'] = vmax - vmin
+        res['voltage_high'] = top
+        res['voltage_low'] = base
+        res['amplitude'] = amp
+        res['voltage_average'] = np.nanmean(y, axis=1)
+        res['voltage_rms'] = np.sqrt(np.nanmean(y**2, axis=1))
+        res['overshoot'] = (vmax - top) / amp * 100
+        res['preshoot'] = (base - vmin) / amp * 100
+
+        edge_funcs = HostMeasurementFunction - set(res)
+        if not edge_funcs.intersection(functions):
+            return res
+
+        r_rows, r_low, r_mid, r_high = _rising_edges(y, low, middle, high)
+        f_rows, f_high, f_mid, f_low = _rising_edges(-y, -high, -middle, -low)
+
+        res['rise_time'] = _first(r_rows, r_high - r_low, n) * x_increment
+        res['fall_time'] = _first(f_rows, f_low - f_high, n) * x_increment
+
+        r_count = np.bincount(r_rows, minlength=n)
+        r_first = _first(r_rows, r_mid, n)
+        r_last = _last(r_rows, r_mid, n)
+        period = np.where(r_count > 1, (r_last - r_first) / np.maximum(r_count - 1, 1), np.nan)
+        res['period'] = period * x_increment
+        res['frequency'] = 1 / res['period']
+
+        f_first = _first(f_rows, f_mid, n)
+        wpos = _first_after(f_rows, f_mid, r_first, n) - r_first
+        wneg = _first_after(r_rows, r_mid, f_first, n) - f_first
+        res['width_positive'] = wpos * x_increment
+        res['width_negative'] = wneg * x_increment
+        res['duty_cycle_positive'] = wpos / period * 100
+        res['duty_cycle_negative'] = wneg / period * 100
+
+        # cycle measurements over an integer number of periods
+        cols = np.arange(m)
+        cycle = (cols >= np.ceil(r_first)[:, None]) & (cols <= np.floor(r_last)[:, None])
+        cycle &= ~np.isnan(y)
+        num = np.where(r_count > 1, cycle.sum(axis=1), 0)
+        res['voltage_cycle_average'] = np.where(num > 0, np.where(cycle, y, 0).sum(axis=1) / num, np.nan)
+        res['voltage_cycle_rms'] = np.where(num > 0, np.sqrt(np.where(cycle, y**2, 0).sum(axis=1) / num), np.nan)
+
+    return res
+
+def measure_waveforms(traces, measurement_functions, reference_levels=(10, 50, 90)):
+    """
+    Compute waveform measurements on the host for one or more traces.
+
+    traces is a TraceYT or a list of TraceYT objects, measurement_functions
+    is a name or list of names from the IVI measurement function set and
+    reference_levels is a (low, middle, high) tuple in percent of the
+    amplitude.  Traces of equal length are processed together as one 2-D
+    array.  Returns a dict mapping each measurement function to a numpy
+    array with one value per trace, or to a float if a single trace was
+    passed.  Measurements that cannot be performed on a trace are NaN.
+    """
+    single = not isinstance(traces, (list, tuple))
+    if single:
+        traces = [traces]
+    if not isinstance(measurement_functions, (list, tuple, set)):
+        measurement_functions = [measurement_functions]
+    for func in measurement_functions:
+        if func not in HostMeasurementFunction:
+            raise ivi.ValueNotSupportedException()
+
+    res = dict((func, np.full(len(traces), np.nan)) for func in measurement_functions)
+
+    # group traces by length so that each group is one 2-D block
+    groups = dict()
+    for i, trace in enumerate(traces):
+        groups.setdefault(len(trace), list()).append(i)
+
+    for length, idx in groups.items():
+        if length < 2:
+            continue
+        y = np.vstack([traces[i].y for i in idx])
+        x_increment = np.array([traces[i].x_increment for i in idx], dtype=float)
+        block = _measure_block(y, x_increment, measurement_functions, reference_levels)
+        for func in measurement_functions:
+            res[func][idx] = block[func]
+
+    if single:
+        return dict((func, float(res[func][0])) for func in measurement_functions)
+    return res
+
+
+class HostWaveformMeasurement(ivi.IviContainer):
+    "Extension IVI methods for computing waveform measurements on the host"
+
+    def __init__(self, *args, **kwargs):
+        super(HostWaveformMeasurement, self).__init__(*args, **kwargs)
+
+        self._add_method('measurement.compute_waveform_measurements',
+                        self._measurement_compute_waveform_measurements,
+                        ivi.Doc("""
+                        Computes waveform measurements on previously fetched traces on the
+                        host instead of querying each measurement from the instrument.  Accepts
+                        a single trace or a list of traces and a measurement function name or a
+                        list of names (see fetch_waveform_measurement for the supported
+                        functions).  The reference levels configured with the reference_level
+                        properties are used.
+
+                        Returns a dict mapping each measurement function to the measured value,
+                        or to a numpy array with one value per trace when a list of traces is
+                        passed.  Values that cannot be measured are NaN.
+                        """))
+        self._add_method('channels[].measurement.fetch_waveform_measurements',
+                        self._measurement_fetch_waveform_measurements,
+                        ivi.Doc("""
+                        Fetches the waveform for the channel once and computes all of the
+                        specified waveform measurements on the host.  Returns a dict mapping
+                        each measurement function to its value.  See
+                        measurement.compute_waveform_measurements.
+                        """))
+
+    def _measurement_compute_waveform_measurements(self, traces, measurement_functions):
+        levels = (self._get_reference_level_low(),
+                self._get_reference_level_middle(),
+                self._get_reference_level_high())
+        return measure_waveforms(traces, measurement_functions, levels)
+
+    def _measurement_fetch_waveform_measurements(self, index, measurement_functions):
+        trace = self._measurement_fetch_waveform(index)
+        return self._measurement_compute_waveform_measurements(trace, measurement_functions)
+
+
@@ -0,0 +1,76 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import unittest
+
+import numpy as np
+
+from ... import ivi
+from .. import scope
+
+def square_wave(frequency, duty, points=10000, dt=1e-9, edge=25):
+    t = np.arange(points) * dt
+    y = np.where((t * frequency) % 1 < duty, 1.0, 0.0)
+    # linear edges of edge samples
+    y = np.convolve(y, np.ones(edge) / edge, 'same')
+    trace = ivi.TraceYT()
+    trace.x_increment = dt
+    trace.y_increment = 1e-3
+    trace.y_raw = np.rint(y * 1000).astype('int16')
+    return trace
+
+class TestHostWaveformMeasurement(unittest.TestCase):
+
+    def setUp(self):
+        self.traces = [square_wave(1e6, 0.3), square_wave(2e6, 0.5)]
+
+    def test_voltage(self):
+        res = scope.measure_waveforms(self.traces, ['voltage_high', 'voltage_low', 'amplitude', 'voltage_peak_to_peak'])
+        self.assertTrue(np.allclose(res['voltage_high'], 1.0))
+        self.assertTrue(np.allclose(res['voltage_low'], 0.0))
+        self.assertTrue(np.allclose(res['amplitude'], 1.0))
+        self.assertTrue(np.allclose(res['voltage_peak_to_peak'], 1.0))
+
+    def test_timing(self):
+        res = scope.measure_waveforms(self.traces, ['frequency', 'period', 'rise_time', 'fall_time', 'duty_cycle_positive', 'width_negative'])
+        self.assertTrue(np.allclose(res['frequency'], [1e6, 2e6]))
+        self.assertTrue(np.allclose(res['period'], [1e-6, 0.5e-6]))
+        self.assertTrue(np.allclose(res['rise_time'], 20e-9))
+        self.assertTrue(np.allclose(res['fall_time'], 20e-9))
+        self.assertTrue(np.allclose(res['duty_cycle_positive'], [30, 50]))
+        self.assertTrue(np.allclose(res['width_negative'], [700e-9, 250e-9]))
+
+    def test_reference_levels(self):
+        res = scope.measure_waveforms(self.traces[0], 'rise_time', (20, 50, 80))
+        self.assertAlmostEqual(res['rise_time'], 15e-9)
+
+    def test_single_trace(self):
+        res = scope.measure_waveforms(self.traces[0], 'frequency')
+        self.assertTrue(isinstance(res['frequency'], float))
+        self.assertRaises(ivi.ValueNotSupportedException, scope.measure_waveforms, self.traces, 'phase')
+
+if __name__ == '__main__':
+    unittest.main()
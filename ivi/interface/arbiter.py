@@ -0,0 +1,103 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import contextlib
+import threading
+
+class BusArbiter(object):
+    "Serializes transactions from several sessions sharing one bus"
+    def __init__(self, batch_limit = 8):
+        self.cond = threading.Condition()
+        self.owner = None
+        self.depth = 0
+        # address of the current batch and number of consecutive grants
+        self.address = None
+        self.batch_count = 0
+        # consecutive grants to one address while others wait
+        self.batch_limit = batch_limit
+        self.waiting = list()
+        self.seq = 0
+
+    def next_waiting(self):
+        # highest priority first, then the current address if the batch
+        # limit has not been reached, then first come, first served
+        top = max(e[0] for e in self.waiting)
+        candidates = [e for e in self.waiting if e[0] == top]
+        if self.batch_count < self.batch_limit:
+            for e in candidates:
+                if e[2] == self.address:
+                    return e
+        return candidates[0]
+
+    def acquire(self, address = None, priority = 0):
+        "Wait for exclusive access to the bus"
+        me = threading.current_thread()
+        with self.cond:
+            if self.owner is me:
+                self.depth += 1
+                return
+            entry = (priority, self.seq, address, me)
+            self.seq += 1
+            self.waiting.append(entry)
+            while self.owner is not None or self.next_waiting() is not entry:
+                self.cond.wait()
+            self.waiting.remove(entry)
+            self.owner = me
+            self.depth = 1
+            if address == self.address:
+                self.batch_count += 1
+            else:
+                self.address = address
+                self.batch_count = 1
+
+    def release(self):
+        "Release the bus"
+        with self.cond:
+            if self.owner is not threading.current_thread():
+                raise RuntimeError("Bus not held by this thread")
+            self.depth -= 1
+            if self.depth == 0:
+                self.owner = None
+                self.cond.notify_all()
+
+    @contextlib.contextmanager
+    def transaction(self, address = None, priority = 0):
+        "Context manager holding the bus for a transaction"
+        self.acquire(address, priority)
+        try:
+            yield self
+        finally:
+            self.release()
+
+_arbiters = dict()
+_arbiters_lock = threading.Lock()
+
+def get_bus_arbiter(bus):
+    "Returns the arbiter shared by all sessions on the specified bus"
+    with _arbiters_lock:
+        if bus not in _arbiters:
+            _arbiters[bus] = BusArbiter()
+        return _arbiters[bus]
@@ -0,0 +1,423 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import re
+import socket
+import struct
+import threading
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# message types
+INITIALIZE = 0
+INITIALIZE_RESPONSE = 1
+FATAL_ERROR = 2
+ERROR = 3
+ASYNC_LOCK = 4
+ASYNC_LOCK_RESPONSE = 5
+DATA = 6
+DATA_END = 7
+DEVICE_CLEAR_COMPLETE = 8
+DEVICE_CLEAR_ACKNOWLEDGE = 9
+ASYNC_REMOTE_LOCAL_CONTROL = 10
+ASYNC_REMOTE_LOCAL_RESPONSE = 11
+TRIGGER = 12
+INTERRUPTED = 13
+ASYNC_INTERRUPTED = 14
+ASYNC_MAXIMUM_MESSAGE_SIZE = 15
+ASYNC_MAXIMUM_MESSAGE_SIZE_RESPONSE = 16
+ASYNC_INITIALIZE = 17
+ASYNC_INITIALIZE_RESPONSE = 18
+ASYNC_DEVICE_CLEAR = 19
+ASYNC_SERVICE_REQUEST = 20
+ASYNC_STATUS_QUERY = 21
+ASYNC_STATUS_RESPONSE = 22
+ASYNC_DEVICE_CLEAR_ACKNOWLEDGE = 23
+ASYNC_LOCK_INFO = 24
+ASYNC_LOCK_INFO_RESPONSE = 25
+
+# remote/local control codes
+RL_DISABLE_REMOTE = 0
+RL_ENABLE_REMOTE = 1
+RL_DISABLE_REMOTE_GTL = 2
+RL_ENABLE_REMOTE_GTR = 3
+RL_ENABLE_REMOTE_LLO = 4
+RL_ENABLE_REMOTE_GTR_LLO = 5
+RL_GTL = 6
+
+PROTOCOL_VERSION = 0x0100
+VENDOR_ID = b'PI'
+INITIAL_MESSAGE_ID = 0xffffff00
+DEFAULT_PORT = 4880
+
+HEADER = struct.Struct('>2sBBIQ')
+
+def parse_visa_resource_string(resource_string):
+    # valid resource strings:
+    # TCPIP::10.0.0.1::hislip0::INSTR
+    # TCPIP0::10.0.0.1::hislip0::INSTR
+    # TCPIP0::10.0.0.1::hislip0,4880::INSTR
+    m = re.match('^(?P<prefix>(?P<type>TCPIP)\d*)(::(?P<arg1>[^\s:]+))(::(?P<arg2>hislip[^\s:,]*)(,(?P<port>\d+))?)(::(?P<suffix>INSTR))$',
+            resource_string, re.I)
+
+    if m is not None:
+        return dict(
+                type = m.group('type').upper(),
+                prefix = m.group('prefix'),
+                arg1 = m.group('arg1'),
+                arg2 = m.group('arg2'),
+                port = m.group('port'),
+                suffix = m.group('suffix'),
+        )
+
+def recv_exact(sock, view):
+    "Receive exactly len(view) bytes into view"
+    count = 0
+    size = len(view)
+    while count < size:
+        n = sock.recv_into(view[count:])
+        if n == 0:
+            raise IOError("Connection closed")
+        count += n
+
+def send_message(sock, msg_type, control_code=0, parameter=0, payload=b''):
+    "Send HiSLIP message"
+    sock.sendall(HEADER.pack(b'HS', msg_type, control_code, parameter, len(payload)) + payload)
+
+def recv_message(sock):
+    "Receive HiSLIP message, returns (type, control code, parameter, payload)"
+    header = bytearray(HEADER.size)
+    recv_exact(sock, memoryview(header))
+    prologue, msg_type, control_code, parameter, length = HEADER.unpack(bytes(header))
+    if prologue != b'HS':
+        raise IOError("Invalid HiSLIP message prologue")
+    payload = bytearray(length)
+    if length:
+        recv_exact(sock, memoryview(payload))
+    return msg_type, control_code, parameter, payload
+
+class HislipInstrument:
+    "HiSLIP instrument interface client"
+    def __init__(self, host, sub_address = 'hislip0', port = DEFAULT_PORT, timeout = 10, overlapped = True):
+
+        if host.upper().startswith('TCPIP') and '::' in host:
+            res = parse_visa_resource_string(host)
+
+            if res is None:
+                raise IOError("Invalid resource string")
+
+            host = res['arg1']
+            sub_address = res['arg2']
+            if res['port'] is not None:
+                port = int(res['port'])
+
+        self.host = host
+        self.sub_address = sub_address
+        self.port = port
+        self.timeout = timeout
+
+        self.message_id = INITIAL_MESSAGE_ID
+        self.rmt_delivered = False
+        self.max_message_size = 1024*1024
+
+        # current response message; message_end is set when the DataEnd
+        # message has been received
+        self.read_buffer = bytearray()
+        self.message_end = False
+
+        # service request handling
+        self.srq_event = threading.Event()
+        self.srq_status = 0
+        self.srq_handler = None
+        self.async_responses = queue.Queue()
+
+        # synchronous channel
+        self.sync = socket.create_connection((host, port), timeout)
+        self.sync.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        send_message(self.sync, INITIALIZE, 0, (PROTOCOL_VERSION << 16) |
+                struct.unpack('>H', VENDOR_ID)[0], sub_address.encode('utf-8'))
+        msg_type, control_code, parameter, payload = self.recv_sync()
+        if msg_type != INITIALIZE_RESPONSE:
+            raise IOError("Unexpected HiSLIP message type %d" % msg_type)
+        self.overlapped = bool(control_code & 1)
+        self.pipeline_mode = 'overlapped' if self.overlapped else 'join'
+        self.server_version = parameter >> 16
+        self.session_id = parameter & 0xffff
+
+        # asynchronous channel
+        self.async_socket = socket.create_connection((host, port), timeout)
+        self.async_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        send_message(self.async_socket, ASYNC_INITIALIZE, 0, self.session_id)
+        msg_type, control_code, parameter, payload = recv_message(self.async_socket)
+        if msg_type != ASYNC_INITIALIZE_RESPONSE:
+            raise IOError("Unexpected HiSLIP message type %d" % msg_type)
+        self.server_vendor_id = parameter
+
+        send_message(self.async_socket, ASYNC_MAXIMUM_MESSAGE_SIZE, 0, 0,
+                struct.pack('>Q', self.max_message_size))
+        msg_type, control_code, parameter, payload = recv_message(self.async_socket)
+        if msg_type != ASYNC_MAXIMUM_MESSAGE_SIZE_RESPONSE:
+            raise IOError("Unexpected HiSLIP message type %d" % msg_type)
+        self.max_message_size = min(self.max_message_size, struct.unpack('>Q', bytes(payload))[0])
+
+        # the async channel is serviced by a background thread so that
+        # service requests are delivered as they arrive
+        self.async_socket.settimeout(None)
+        self.async_thread = threading.Thread(target=self.async_run)
+        self.async_thread.daemon = True
+        self.async_thread.start()
+
+        if self.overlapped != bool(overlapped):
+            # request the other mode through device clear feature negotiation
+            self.clear(overlapped)
+
+    def close(self):
+        "Close connection"
+        for sock in (self.sync, self.async_socket):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            sock.close()
+        self.async_thread.join()
+
+    def async_run(self):
+        while True:
+            try:
+                msg = recv_message(self.async_socket)
+            except (IOError, socket.error):
+                self.async_responses.put(None)
+                return
+            if msg[0] == ASYNC_SERVICE_REQUEST:
+                self.srq_status = msg[1]
+                self.srq_event.set()
+                if self.srq_handler is not None:
+                    self.srq_handler(msg[1])
+            else:
+                self.async_responses.put(msg)
+
+    def async_request(self, msg_type, control_code=0, parameter=0, payload=b'', response_type=None):
+        "Send message on asynchronous channel and wait for the response"
+        send_message(self.async_socket, msg_type, control_code, parameter, payload)
+        try:
+            msg = self.async_responses.get(timeout=self.timeout)
+        except queue.Empty:
+            raise IOError("Timed out waiting for HiSLIP response")
+        if msg is None:
+            raise IOError("Connection closed")
+        if msg[0] in (ERROR, FATAL_ERROR):
+            raise IOError("HiSLIP error %d: %s" % (msg[1], bytes(msg[3]).decode('utf-8', 'replace')))
+        if response_type is not None and msg[0] != response_type:
+            raise IOError("Unexpected HiSLIP message type %d" % msg[0])
+        return msg
+
+    def recv_sync(self):
+        "Receive message on synchronous channel"
+        msg = recv_message(self.sync)
+        if msg[0] in (ERROR, FATAL_ERROR):
+            raise IOError("HiSLIP error %d: %s" % (msg[1], bytes(msg[3]).decode('utf-8', 'replace')))
+        return msg
+
+    def next_message_id(self):
+        message_id = self.message_id
+        self.message_id = (self.message_id + 2) & 0xffffffff
+        return message_id
+
+    def write_raw(self, data):
+        "Write binary data to instrument"
+        size = self.max_message_size - HEADER.size
+        offset = 0
+        while True:
+            block = data[offset:offset+size]
+            offset += size
+            msg_type = DATA if offset < len(data) else DATA_END
+            send_message(self.sync, msg_type, int(self.rmt_delivered),
+                    self.next_message_id(), block)
+            self.rmt_delivered = False
+            if msg_type == DATA_END:
+                break
+
+    def recv_data(self):
+        "Receive one Data or DataEnd message into read_buffer"
+        header = bytearray(HEADER.size)
+        recv_exact(self.sync, memoryview(header))
+        prologue, msg_type, control_code, parameter, length = HEADER.unpack(bytes(header))
+        if prologue != b'HS':
+            raise IOError("Invalid HiSLIP message prologue")
+
+        if msg_type in (DATA, DATA_END):
+            # receive payload directly into read buffer
+            start = len(self.read_buffer)
+            self.read_buffer += bytearray(length)
+            recv_exact(self.sync, memoryview(self.read_buffer)[start:])
+            if msg_type == DATA_END:
+                self.message_end = True
+            return
+
+        payload = bytearray(length)
+        if length:
+            recv_exact(self.sync, memoryview(payload))
+
+        if msg_type == INTERRUPTED:
+            # response was discarded by the instrument
+            del self.read_buffer[:]
+        elif msg_type in (ERROR, FATAL_ERROR):
+            raise IOError("HiSLIP error %d: %s" % (control_code, bytes(payload).decode('utf-8', 'replace')))
+        else:
+            raise IOError("Unexpected HiSLIP message type %d" % msg_type)
+
+    def read_raw(self, num=-1):
+        "Read binary data from instrument"
+        buf = self.read_buffer
+        while not self.message_end and (num < 0 or len(buf) < num):
+            self.recv_data()
+
+        end = len(buf)
+        if num >= 0 and num < end:
+            end = num
+
+        data = bytes(buf[:end])
+        del buf[:end]
+
+        if self.message_end and len(buf) == 0:
+            # response completely read
+            self.message_end = False
+            self.rmt_delivered = True
+
+        return data
+
+    def read_into(self, buffer):
+        "Read binary data from instrument into buffer, returns number of bytes read"
+        view = memoryview(buffer)
+        if view.itemsize != 1:
+            view = view.cast('B')
+        size = len(view)
+        count = 0
+        while count < size:
+            data = self.read_raw(size - count)
+            if len(data) == 0:
+                break
+            view[count:count+len(data)] = data
+            count += len(data)
+        return count
+
+    def ask_raw(self, data, num=-1):
+        "Write then read binary data"
+        self.write_raw(data)
+        return self.read_raw(num)
+
+    def write(self, message, encoding = 'utf-8'):
+        "Write string to instrument"
+        if type(message) is tuple or type(message) is list:
+            # recursive call for a list of commands
+            for message_i in message:
+                self.write(message_i, encoding)
+            return
+
+        self.write_raw(str(message).encode(encoding))
+
+    def read(self, num=-1, encoding = 'utf-8'):
+        "Read string from instrument"
+        return self.read_raw(num).decode(encoding).rstrip('\r\n')
+
+    def ask(self, message, num=-1, encoding = 'utf-8'):
+        "Write then read string"
+        if type(message) is tuple or type(message) is list:
+            if self.overlapped:
+                # overlapped mode: send all queries before reading responses
+                for message_i in message:
+                    self.write(message_i, encoding)
+                return [self.read(num, encoding) for message_i in message]
+            # recursive call for a list of commands
+            val = list()
+            for message_i in message:
+                val.append(self.ask(message_i, num, encoding))
+            return val
+
+        self.write(message, encoding)
+        return self.read(num, encoding)
+
+    def read_stb(self):
+        "Read status byte"
+        msg = self.async_request(ASYNC_STATUS_QUERY, int(self.rmt_delivered),
+                (self.message_id - 2) & 0xffffffff, response_type=ASYNC_STATUS_RESPONSE)
+        self.rmt_delivered = False
+        return msg[1]
+
+    def wait_for_srq(self, timeout = None):
+        "Wait for service request, returns status byte or None on timeout"
+        if not self.srq_event.wait(timeout):
+            return None
+        self.srq_event.clear()
+        return self.srq_status
+
+    def trigger(self):
+        "Send trigger command"
+        send_message(self.sync, TRIGGER, int(self.rmt_delivered), self.next_message_id())
+        self.rmt_delivered = False
+
+    def clear(self, overlapped = None):
+        "Send clear command"
+        if overlapped is None:
+            overlapped = self.overlapped
+        self.async_request(ASYNC_DEVICE_CLEAR, response_type=ASYNC_DEVICE_CLEAR_ACKNOWLEDGE)
+        send_message(self.sync, DEVICE_CLEAR_COMPLETE, int(bool(overlapped)))
+        while True:
+            # discard anything queued on the synchronous channel
+            msg_type, control_code, parameter, payload = self.recv_sync()
+            if msg_type == DEVICE_CLEAR_ACKNOWLEDGE:
+                break
+        self.overlapped = bool(control_code & 1)
+        self.pipeline_mode = 'overlapped' if self.overlapped else 'join'
+        self.message_id = INITIAL_MESSAGE_ID
+        self.rmt_delivered = False
+        del self.read_buffer[:]
+        self.message_end = False
+
+    def remote(self):
+        "Send remote command"
+        self.async_request(ASYNC_REMOTE_LOCAL_CONTROL, RL_ENABLE_REMOTE_GTR,
+                (self.message_id - 2) & 0xffffffff, response_type=ASYNC_REMOTE_LOCAL_RESPONSE)
+
+    def local(self):
+        "Send local command"
+        self.async_request(ASYNC_REMOTE_LOCAL_CONTROL, RL_GTL,
+                (self.message_id - 2) & 0xffffffff, response_type=ASYNC_REMOTE_LOCAL_RESPONSE)
+
+    def lock(self):
+        "Send lock command"
+        msg = self.async_request(ASYNC_LOCK, 1, int(self.timeout*1000), b'',
+                response_type=ASYNC_LOCK_RESPONSE)
+        if msg[1] != 1:
+            raise IOError("Failed to acquire lock")
+
+    def unlock(self):
+        "Send unlock command"
+        self.async_request(ASYNC_LOCK, 0, (self.message_id - 2) & 0xffffffff,
+                response_type=ASYNC_LOCK_RESPONSE)
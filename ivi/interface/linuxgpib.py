@@ -27,6 +27,11 @@ THE SOFTWARE.
 import Gpib
 import re
 
+from . import arbiter
+
+# ibsta END bit, set when a read is terminated by EOI
+END = 0x2000
+
 def parse_visa_resource_string(resource_string):
     # valid resource strings:
     # GPIB::10::INSTR
@@ -65,23 +70,98 @@ class LinuxGpibInstrument:
 
         self.gpib = Gpib.Gpib(name, pad, sad, timeout, send_eoi, eos_mode)
 
+        # all sessions on one board share an arbiter so that transactions
+        # from different threads are not interleaved; raise priority for
+        # time-critical instruments
+        board = name
+        m = re.match('^gpib(\d+)$', str(name), re.I)
+        if m is not None:
+            board = int(m.group(1))
+        self.pad = pad
+        self.priority = 0
+        self.arbiter = arbiter.get_bus_arbiter(('gpib', board))
+
+        # maximum number of bytes per GPIB read transaction
+        self.read_size = 1024*1024
+
+        # queries can be combined into one program message
+        self.pipeline_mode = 'join'
+
     def write_raw(self, data):
         "Write binary data to instrument"
         
-        self.gpib.write(data)
+        with self.arbiter.transaction(self.pad, self.priority):
+            self.gpib.write(data)
 
     def read_raw(self, num=-1):
         "Read binary data from instrument"
         
-        if num < 0:
-            num = 512
+        with self.arbiter.transaction(self.pad, self.priority):
+            if num >= 0:
+                return self.gpib.read(num)
+            
+            # read until EOI in read_size transactions
+            data = list()
+            while True:
+                d = self.gpib.read(self.read_size)
+                data.append(d)
+                if len(d) < self.read_size or self.gpib.ibsta() & END:
+                    break
+            
+            return b''.join(data)
+    
+    def read_ieee_block(self):
+        "Read IEEE block"
+        with self.arbiter.transaction(self.pad, self.priority):
+            return self._read_ieee_block()
+    
+    def _read_ieee_block(self):
+        # read the header and as much of the payload as possible in one
+        # transaction, then read the remainder of the payload, if any
+        data = self.gpib.read(self.read_size)
+        
+        if len(data) == 0:
+            return b''
+        
+        ind = data.find(b'#')
+        while ind < 0 or len(data) < ind+2:
+            d = self.gpib.read(self.read_size)
+            if len(d) == 0:
+                return b''
+            data += d
+            ind = data.find(b'#')
+        
+        l = int(data[ind+1:ind+2])
+        if l == 0:
+            if not self.gpib.ibsta() & END and len(data) == self.read_size:
+                data += self.read_raw()
+            return data[ind+2:]
+        
+        while len(data) < ind+2+l:
+            data += self.gpib.read(ind+2+l-len(data))
+        
+        num = int(data[ind+2:ind+2+l])
+        start = ind+2+l
+        
+        if len(data) < start+num:
+            # read remainder of payload in a single transaction
+            chunks = [data[start:]]
+            count = len(data) - start
+            while count < num:
+                d = self.gpib.read(num - count)
+                if len(d) == 0:
+                    break
+                chunks.append(d)
+                count += len(d)
+            return b''.join(chunks)
         
-        return self.gpib.read(num)
+        return data[start:start+num]
     
     def ask_raw(self, data, num=-1):
         "Write then read binary data"
-        self.write_raw(data)
-        return self.read_raw(num)
+        with self.arbiter.transaction(self.pad, self.priority):
+            self.write_raw(data)
+            return self.read_raw(num)
     
     def write(self, message, encoding = 'utf-8'):
         "Write string to instrument"
@@ -106,8 +186,9 @@ class LinuxGpibInstrument:
                 val.append(self.ask(message_i, num, encoding))
             return val
 
-        self.write(message, encoding)
-        return self.read(num, encoding)
+        with self.arbiter.transaction(self.pad, self.priority):
+            self.write(message, encoding)
+            return self.read(num, encoding)
     
     def read_stb(self):
         "Read status byte"
@@ -116,12 +197,14 @@ class LinuxGpibInstrument:
     def trigger(self):
         "Send trigger command"
         
-        self.gpib.trigger()
+        with self.arbiter.transaction(self.pad, self.priority):
+            self.gpib.trigger()
     
     def clear(self):
         "Send clear command"
         
-        self.gpib.clear()
+        with self.arbiter.transaction(self.pad, self.priority):
+            self.gpib.clear()
     
     def remote(self):
         "Send remote command"
@@ -90,6 +90,20 @@ class SerialInstrument:
         self.wait_dsr = False
         self.message_delay = 0
 
+        # flow control mode: 'delay' sleeps message_delay after every message
+        # and then waits for DSR if wait_dsr is set, 'dsr' waits up to
+        # message_delay for the instrument to deassert DSR and then for DSR
+        # to be reasserted, with no fixed sleep
+        self.flow_control = 'delay'
+        self.dsr_timeout = 10
+        self.adaptive_delay = False
+        self.min_message_delay = 0.0005
+
+        self.read_buffer = bytearray()
+
+        # queries can be combined into one program message
+        self.pipeline_mode = 'join'
+
         self.update_settings()
     
     def update_settings(self):
@@ -140,28 +154,98 @@ class SerialInstrument:
         
         self.serial.write(data)
         
+        if self.flow_control == 'dsr':
+            self.wait_dsr_event()
+            return
+        
         if self.message_delay > 0:
             time.sleep(self.message_delay)
         
         if self.wait_dsr:
-            while not self.serial.getDSR():
+            while not self.get_dsr():
                 time.sleep(0.01)
     
+    def get_dsr(self):
+        "Read DSR line state"
+        try:
+            return self.serial.dsr
+        except AttributeError:
+            return self.serial.getDSR()
+    
+    def poll_dsr(self, state, deadline):
+        "Wait for DSR to reach state, returns False if deadline passes first"
+        # pySerial has no portable modem status change event, so poll with
+        # a short, growing interval
+        interval = 0.0001
+        while self.get_dsr() != state:
+            now = time.time()
+            if now >= deadline:
+                return False
+            time.sleep(min(interval, deadline - now))
+            interval = min(interval * 2, 0.005)
+        return True
+    
+    def wait_dsr_event(self):
+        "Wait for the instrument to finish processing a message (DSR handshake)"
+        start = time.time()
+        
+        # the instrument takes a moment to deassert DSR after a message;
+        # wait up to message_delay for it to do so
+        busy = False
+        if self.message_delay > 0:
+            busy = self.poll_dsr(False, start + self.message_delay)
+            latency = time.time() - start
+        
+        if not self.poll_dsr(True, start + self.dsr_timeout):
+            raise IOError("Timed out waiting for DSR")
+        
+        if self.adaptive_delay and busy:
+            # learn the minimum delay: twice the longest recently observed
+            # latency, shrinking by at most half per message
+            self.message_delay = max(2*latency, self.message_delay/2, self.min_message_delay)
+    
     def read_raw(self, num=-1):
         "Read binary data from instrument"
         
-        data = b''
-        term_char = str(self.term_char).encode('utf-8')[0:1]
+        # bytes read past the end of a message are kept in self.read_buffer
+        # for the next call
+        buf = self.read_buffer
+        term_char = None
+        if self.term_char is not None:
+            term_char = str(self.term_char).encode('utf-8')[0:1]
         
+        start = 0
         while True:
-            c = self.serial.read(1)
-            data += c
-            num -= 1
-            if c == term_char:
-                break
-            if num == 0:
+            # look for termination character in new data
+            end = len(buf)
+            if num > 0 and end > num:
+                end = num
+            if term_char is not None:
+                i = buf.find(term_char, start, end)
+                if i >= 0:
+                    end = i+1
+                    break
+            start = end
+            if num > 0 and end >= num:
                 break
             
+            # read whatever is waiting, at least one byte
+            try:
+                waiting = self.serial.in_waiting
+            except AttributeError:
+                waiting = self.serial.inWaiting()
+            count = max(waiting, 1)
+            if num > 0:
+                count = min(count, num - len(buf))
+            data = self.serial.read(count)
+            if len(data) == 0:
+                # timeout
+                end = len(buf)
+                break
+            buf.extend(data)
+        
+        data = bytes(buf[:end])
+        del buf[:end]
         return data
     
     def ask_raw(self, data, num=-1):
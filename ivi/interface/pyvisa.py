@@ -24,7 +24,6 @@ THE SOFTWARE.
 
 """
 
-import io
 import sys
 from distutils.version import StrictVersion
 
@@ -57,22 +56,96 @@ class PyVisaInstrument:
                 self.instrument.trigger = self.instrument.assert_trigger
         else:
             self.instrument = resource
-        self.buffer = io.BytesIO()
+        # PyVISA only supports reading entire messages, so unread data is
+        # kept in buffer, starting at offset
+        self.buffer = bytearray()
+        self.offset = 0
+        # chunk size for known length reads
+        self.chunk_size = 1024*1024
+
+        # queries can be combined into one program message
+        self.pipeline_mode = 'join'
 
     def write_raw(self, data):
         "Write binary data to instrument"
         self.instrument.write_raw(data)
 
+    def fill_buffer(self):
+        "Read next message into buffer, returns number of bytes available"
+        if self.offset >= len(self.buffer):
+            # reuses the bytearray allocation
+            self.buffer[:] = self.instrument.read_raw()
+            self.offset = 0
+        return len(self.buffer) - self.offset
+
     def read_raw(self, num=-1):
         "Read binary data from instrument"
-        # PyVISA only supports reading entire buffer
-        #return self.instrument.read_raw()
-        data = self.buffer.read(num)
-        if len(data) == 0:
-            self.buffer = io.BytesIO(self.instrument.read_raw())
-            data = self.buffer.read(num)
+        count = self.fill_buffer()
+        if num >= 0 and num < count:
+            count = num
+        data = bytes(memoryview(self.buffer)[self.offset:self.offset+count])
+        self.offset += count
         return data
 
+    def read_bytes(self, num):
+        "Read exactly num bytes from instrument"
+        if num <= 0:
+            return b''
+        if self.offset < len(self.buffer) or not hasattr(self.instrument, 'read_bytes'):
+            buf = bytearray(num)
+            count = self.read_into(buf)
+            return bytes(buf[:count])
+        return self.instrument.read_bytes(num, self.chunk_size)
+
+    def read_into(self, buffer):
+        "Read binary data from instrument into buffer, returns number of bytes read"
+        view = memoryview(buffer)
+        if view.itemsize != 1:
+            view = view.cast('B')
+        size = len(view)
+        count = 0
+
+        # data left over from a previous read
+        if self.offset < len(self.buffer):
+            n = min(size, len(self.buffer) - self.offset)
+            view[0:n] = memoryview(self.buffer)[self.offset:self.offset+n]
+            self.offset += n
+            count = n
+
+        while count < size:
+            if hasattr(self.instrument, 'read_bytes'):
+                data = self.instrument.read_bytes(min(self.chunk_size, size - count), self.chunk_size)
+            else:
+                data = self.read_raw(size - count)
+            if len(data) == 0:
+                break
+            view[count:count+len(data)] = data
+            count += len(data)
+
+        return count
+
+    def read_ieee_block(self):
+        "Read IEEE block"
+        # IEEE block binary data is prefixed with #lnnnnnnnn
+        # where l is length of n and n is the
+        # length of the data
+        # ex: #800002000 prefixes 2000 data bytes
+
+        data = self.read_bytes(2)
+
+        if len(data) == 0:
+            return b''
+
+        while data[0:1] != b'#':
+            data = data[1:] + self.read_bytes(1)
+
+        l = int(data[1:2])
+        if l > 0:
+            num = int(self.read_bytes(l))
+            return self.read_bytes(num)
+        else:
+            return self.read_raw()
+
     def ask_raw(self, data, num=-1):
         "Write then read binary data"
         self.write_raw(data)
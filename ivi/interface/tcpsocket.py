@@ -0,0 +1,235 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import re
+import socket
+
+def parse_visa_resource_string(resource_string):
+    # valid resource strings:
+    # TCPIP::10.0.0.1::5025::SOCKET
+    # TCPIP0::10.0.0.1::5025::SOCKET
+    m = re.match('^(?P<prefix>(?P<type>TCPIP)\d*)(::(?P<arg1>[^\s:]+))(::(?P<arg2>[^\s:]+))(::(?P<suffix>SOCKET))$',
+            resource_string, re.I)
+
+    if m is not None:
+        return dict(
+                type = m.group('type').upper(),
+                prefix = m.group('prefix'),
+                arg1 = m.group('arg1'),
+                arg2 = m.group('arg2'),
+                suffix = m.group('suffix'),
+        )
+
+class SocketInstrument:
+    "Raw TCP socket instrument interface client"
+    def __init__(self, host, port = 5025, timeout = 10, recv_buffer_size = 4*1024*1024):
+
+        if host.upper().startswith('TCPIP') and '::' in host:
+            res = parse_visa_resource_string(host)
+
+            if res is None:
+                raise IOError("Invalid resource string")
+
+            host = res['arg1']
+            port = int(res['arg2'])
+
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+
+        self.term_char = '\n'
+
+        # queries can be combined into one program message
+        self.pipeline_mode = 'join'
+
+        self.socket = socket.create_connection((host, port), timeout)
+        # send each message immediately
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # large kernel receive buffer for waveform transfers
+        try:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer_size)
+        except socket.error:
+            pass
+
+        # bytes received past the end of a message are kept in read_buffer
+        self.read_buffer = bytearray()
+        self.recv_size = 65536
+        self.recv_buffer = bytearray(self.recv_size)
+
+    def close(self):
+        "Close connection"
+        self.socket.close()
+
+    def recv(self):
+        "Receive available data into read_buffer"
+        n = self.socket.recv_into(self.recv_buffer)
+        if n == 0:
+            raise IOError("Connection closed")
+        self.read_buffer += memoryview(self.recv_buffer)[:n]
+        return n
+
+    def write_raw(self, data):
+        "Write binary data to instrument"
+
+        if self.term_char is not None:
+            data += str(self.term_char).encode('utf-8')[0:1]
+
+        self.socket.sendall(data)
+
+    def read_raw(self, num=-1):
+        "Read binary data from instrument"
+
+        buf = self.read_buffer
+        term_char = None
+        if self.term_char is not None:
+            term_char = str(self.term_char).encode('utf-8')[0:1]
+
+        start = 0
+        while True:
+            # look for termination character in new data
+            end = len(buf)
+            if num > 0 and end > num:
+                end = num
+            if term_char is not None:
+                i = buf.find(term_char, start, end)
+                if i >= 0:
+                    end = i+1
+                    break
+            start = end
+            if num >= 0 and end >= num:
+                break
+            self.recv()
+
+        data = bytes(buf[:end])
+        del buf[:end]
+        return data
+
+    def read_into(self, buffer):
+        "Read binary data from instrument into buffer, returns number of bytes read"
+        view = memoryview(buffer)
+        if view.itemsize != 1:
+            view = view.cast('B')
+        size = len(view)
+
+        # data left over from a previous read
+        count = min(size, len(self.read_buffer))
+        view[0:count] = memoryview(self.read_buffer)[0:count]
+        del self.read_buffer[:count]
+
+        while count < size:
+            n = self.socket.recv_into(view[count:])
+            if n == 0:
+                raise IOError("Connection closed")
+            count += n
+
+        return count
+
+    def read_ieee_block(self):
+        "Read IEEE block"
+        # IEEE block binary data is prefixed with #lnnnnnnnn
+        # where l is length of n and n is the
+        # length of the data
+        # ex: #800002000 prefixes 2000 data bytes
+
+        buf = self.read_buffer
+
+        while True:
+            ind = buf.find(b'#')
+            if ind >= 0 and len(buf) >= ind+2:
+                l = int(buf[ind+1:ind+2])
+                if len(buf) >= ind+2+l:
+                    break
+            self.recv()
+
+        if l == 0:
+            del buf[:ind+2]
+            return self.read_raw()
+
+        num = int(buf[ind+2:ind+2+l])
+        del buf[:ind+2+l]
+
+        data = bytearray(num)
+        self.read_into(data)
+        return bytes(data)
+
+    def ask_raw(self, data, num=-1):
+        "Write then read binary data"
+        self.write_raw(data)
+        return self.read_raw(num)
+
+    def write(self, message, encoding = 'utf-8'):
+        "Write string to instrument"
+        if type(message) is tuple or type(message) is list:
+            # recursive call for a list of commands
+            for message_i in message:
+                self.write(message_i, encoding)
+            return
+
+        self.write_raw(str(message).encode(encoding))
+
+    def read(self, num=-1, encoding = 'utf-8'):
+        "Read string from instrument"
+        return self.read_raw(num).decode(encoding).rstrip('\r\n')
+
+    def ask(self, message, num=-1, encoding = 'utf-8'):
+        "Write then read string"
+        if type(message) is tuple or type(message) is list:
+            # recursive call for a list of commands
+            val = list()
+            for message_i in message:
+                val.append(self.ask(message_i, num, encoding))
+            return val
+
+        self.write(message, encoding)
+        return self.read(num, encoding)
+
+    def read_stb(self):
+        "Read status byte"
+        return int(self.ask("*STB?"))
+
+    def trigger(self):
+        "Send trigger command"
+        self.write("*TRG")
+
+    def clear(self):
+        "Send clear command"
+        self.write("*CLS")
+
+    def remote(self):
+        "Send remote command"
+        raise NotImplementedError()
+
+    def local(self):
+        "Send local command"
+        raise NotImplementedError()
+
+    def lock(self):
+        "Send lock command"
+        raise NotImplementedError()
+
+    def unlock(self):
+        "Send unlock command"
+        raise NotImplementedError()
@@ -0,0 +1,96 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+Benchmark for the pySerial interface against a local pseudo terminal
+stand-in.  Run with:
+
+    python -m ivi.interface.test.benchmark_pyserial
+
+"""
+
+import time
+
+from .test_pyserial import VirtualSerialInstrument, DSRSerial
+from .. import pyserial
+
+def read_raw_bytewise(inst, num=-1):
+    # byte at a time read loop used before buffered reads
+    data = b''
+    term_char = str(inst.term_char).encode('utf-8')[0:1]
+    while True:
+        c = inst.serial.read(1)
+        data += c
+        num -= 1
+        if c == term_char:
+            break
+        if num == 0:
+            break
+    return data
+
+def bench(vinst, inst, read, size, count):
+    data = b'1' * size + b'\n'
+    vinst.responses[b'DATA?'] = data
+    start = time.time()
+    for i in range(count):
+        inst.write_raw(b'DATA?')
+        assert read(inst) == data
+    return (time.time() - start) / count
+
+def bench_setup(vinst, inst, count):
+    # send a setup sequence with DSR handshaking
+    start = time.time()
+    for i in range(count):
+        inst.write(':SETUP%d' % i)
+    return time.time() - start
+
+def main():
+    vinst = VirtualSerialInstrument()
+    inst = pyserial.SerialInstrument(vinst.port, timeout=5)
+    try:
+        print("%10s %14s %14s %8s" % ('bytes', 'bytewise (s)', 'buffered (s)', 'speedup'))
+        for size, count in ((16, 200), (1000, 50), (10000, 10), (100000, 3)):
+            old = bench(vinst, inst, read_raw_bytewise, size, count)
+            new = bench(vinst, inst, pyserial.SerialInstrument.read_raw, size, count)
+            print("%10d %14.6f %14.6f %8.1f" % (size, old, new, old / new))
+        print("")
+
+        # 50 command setup, instrument drops DSR 1 ms after each command
+        # and stays busy for 2 ms
+        vinst.dsr_latency = 0.001
+        vinst.busy_time = 0.002
+        inst.serial = DSRSerial(inst.serial, vinst)
+        inst.wait_dsr = True
+        print("%-24s %10s" % ('flow control', 'time (s)'))
+        for name, mode, adaptive in (('fixed delay + DSR poll', 'delay', False),
+                ('DSR event', 'dsr', False), ('DSR event, adaptive', 'dsr', True)):
+            inst.flow_control = mode
+            inst.adaptive_delay = adaptive
+            inst.message_delay = 0.1
+            print("%-24s %10.3f" % (name, bench_setup(vinst, inst, 50)))
+    finally:
+        inst.serial.close()
+        vinst.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import threading
+import time
+import unittest
+
+from .. import arbiter
+
+class TestBusArbiter(unittest.TestCase):
+
+    def run_waiters(self, arb, requests):
+        # queue requests while the bus is held, then release it and
+        # return the order in which the bus was granted
+        order = list()
+        lock = threading.Lock()
+
+        def worker(name, address, priority):
+            with arb.transaction(address, priority):
+                with lock:
+                    order.append(name)
+
+        arb.acquire('holder')
+        threads = list()
+        for name, address, priority in requests:
+            t = threading.Thread(target=worker, args=(name, address, priority))
+            t.start()
+            threads.append(t)
+            # wait until queued so that arrival order is deterministic
+            while len(arb.waiting) < len(threads):
+                time.sleep(0.001)
+        arb.release()
+        for t in threads:
+            t.join()
+        return order
+
+    def test_fifo(self):
+        arb = arbiter.BusArbiter()
+        order = self.run_waiters(arb, [('a', 1, 0), ('b', 2, 0), ('c', 3, 0)])
+        self.assertEqual(order, ['a', 'b', 'c'])
+
+    def test_priority(self):
+        arb = arbiter.BusArbiter()
+        order = self.run_waiters(arb, [('a', 1, 0), ('b', 2, 0), ('c', 3, 5)])
+        self.assertEqual(order, ['c', 'a', 'b'])
+
+    def test_batching(self):
+        arb = arbiter.BusArbiter(batch_limit=3)
+        order = self.run_waiters(arb, [('a1', 1, 0), ('b1', 2, 0), ('a2', 1, 0),
+                ('a3', 1, 0), ('a4', 1, 0), ('b2', 2, 0)])
+        # requests to address 1 are batched up to the limit
+        self.assertEqual(order, ['a1', 'a2', 'a3', 'b1', 'b2', 'a4'])
+
+    def test_reentrant(self):
+        arb = arbiter.BusArbiter()
+        with arb.transaction(1):
+            with arb.transaction(1):
+                self.assertEqual(arb.depth, 2)
+        self.assertEqual(arb.owner, None)
+        self.assertRaises(RuntimeError, arb.release)
+
+    def test_serialized(self):
+        arb = arbiter.BusArbiter()
+        active = list()
+        overlaps = list()
+
+        def worker(address):
+            for i in range(50):
+                with arb.transaction(address):
+                    active.append(address)
+                    if len(active) > 1:
+                        overlaps.append(address)
+                    time.sleep(0)
+                    active.remove(address)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(overlaps, [])
+
+    def test_shared(self):
+        self.assertTrue(arbiter.get_bus_arbiter(('gpib', 0)) is arbiter.get_bus_arbiter(('gpib', 0)))
+        self.assertFalse(arbiter.get_bus_arbiter(('gpib', 0)) is arbiter.get_bus_arbiter(('gpib', 1)))
+
+if __name__ == '__main__':
+    unittest.main()
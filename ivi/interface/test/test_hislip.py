@@ -0,0 +1,197 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import socket
+import struct
+import threading
+import unittest
+
+import ivi
+from .. import hislip
+
+class VirtualHislipInstrument(object):
+    "HiSLIP server stand-in"
+    def __init__(self, overlapped = False):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(2)
+        self.port = self.server.getsockname()[1]
+        self.resource = 'TCPIP::127.0.0.1::hislip0,%d::INSTR' % self.port
+        self.overlapped = overlapped
+        self.rx_log = list()
+        self.responses = dict()
+        self.stb = 0
+        self.sync = None
+        self.async_socket = None
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        self.sync, addr = self.server.accept()
+        msg = hislip.recv_message(self.sync)
+        assert msg[0] == hislip.INITIALIZE
+        self.sub_address = bytes(msg[3])
+        hislip.send_message(self.sync, hislip.INITIALIZE_RESPONSE, int(self.overlapped),
+                (hislip.PROTOCOL_VERSION << 16) | 1)
+
+        self.async_socket, addr = self.server.accept()
+        msg = hislip.recv_message(self.async_socket)
+        assert msg[0] == hislip.ASYNC_INITIALIZE and msg[2] == 1
+        hislip.send_message(self.async_socket, hislip.ASYNC_INITIALIZE_RESPONSE, 0, 0x5649)
+
+        t = threading.Thread(target=self.run_async)
+        t.daemon = True
+        t.start()
+
+        data = b''
+        while True:
+            try:
+                msg_type, control_code, parameter, payload = hislip.recv_message(self.sync)
+            except (IOError, socket.error):
+                break
+            if msg_type in (hislip.DATA, hislip.DATA_END):
+                data += bytes(payload)
+                if msg_type == hislip.DATA_END:
+                    self.rx_log.append(data)
+                    if data == b'SRQ':
+                        hislip.send_message(self.async_socket, hislip.ASYNC_SERVICE_REQUEST, 0x40)
+                    elif data in self.responses:
+                        hislip.send_message(self.sync, hislip.DATA_END, 0, parameter, self.responses[data])
+                    data = b''
+            elif msg_type == hislip.TRIGGER:
+                self.rx_log.append('trigger')
+            elif msg_type == hislip.DEVICE_CLEAR_COMPLETE:
+                self.overlapped = bool(control_code & 1)
+                hislip.send_message(self.sync, hislip.DEVICE_CLEAR_ACKNOWLEDGE, int(self.overlapped))
+        t.join()
+
+    def run_async(self):
+        while True:
+            try:
+                msg_type, control_code, parameter, payload = hislip.recv_message(self.async_socket)
+            except (IOError, socket.error):
+                break
+            if msg_type == hislip.ASYNC_MAXIMUM_MESSAGE_SIZE:
+                hislip.send_message(self.async_socket, hislip.ASYNC_MAXIMUM_MESSAGE_SIZE_RESPONSE,
+                        0, 0, struct.pack('>Q', 4096))
+            elif msg_type == hislip.ASYNC_STATUS_QUERY:
+                hislip.send_message(self.async_socket, hislip.ASYNC_STATUS_RESPONSE, self.stb)
+            elif msg_type == hislip.ASYNC_DEVICE_CLEAR:
+                hislip.send_message(self.async_socket, hislip.ASYNC_DEVICE_CLEAR_ACKNOWLEDGE, 1)
+            elif msg_type == hislip.ASYNC_LOCK:
+                hislip.send_message(self.async_socket, hislip.ASYNC_LOCK_RESPONSE, 1)
+            elif msg_type == hislip.ASYNC_REMOTE_LOCAL_CONTROL:
+                hislip.send_message(self.async_socket, hislip.ASYNC_REMOTE_LOCAL_RESPONSE)
+
+    def close(self):
+        self.thread.join()
+        self.server.close()
+
+
+class TestHislipInstrument(unittest.TestCase):
+
+    def setUp(self):
+        self.vinst = VirtualHislipInstrument()
+        self.inst = hislip.HislipInstrument(self.vinst.resource, timeout=2)
+
+    def tearDown(self):
+        self.inst.close()
+        self.vinst.close()
+
+    def test_initialize(self):
+        self.assertEqual(self.vinst.sub_address, b'hislip0')
+        self.assertEqual(self.inst.session_id, 1)
+        self.assertEqual(self.inst.max_message_size, 4096)
+        # overlapped mode negotiated with device clear
+        self.assertTrue(self.inst.overlapped)
+        self.assertTrue(self.vinst.overlapped)
+
+    def test_ask(self):
+        self.vinst.responses[b'*IDN?'] = b'VIRTUAL,HISLIP,0,1.0\n'
+        self.assertEqual(self.inst.ask('*IDN?'), 'VIRTUAL,HISLIP,0,1.0')
+        self.assertEqual(self.vinst.rx_log, [b'*IDN?'])
+
+    def test_overlapped(self):
+        for i in range(5):
+            self.vinst.responses[('Q%d?' % i).encode('utf-8')] = ('R%d' % i).encode('utf-8')
+        # all queries are sent before any response is read
+        self.inst.write('Q0?')
+        self.inst.write('Q1?')
+        self.inst.write('Q2?')
+        self.assertEqual(self.inst.read(), 'R0')
+        self.assertEqual(self.inst.read(), 'R1')
+        self.assertEqual(self.inst.read(), 'R2')
+        self.assertEqual(self.inst.ask(['Q3?', 'Q4?']), ['R3', 'R4'])
+
+    def test_large_message(self):
+        data = bytes(bytearray(i % 256 for i in range(100000)))
+        self.vinst.responses[b'DATA?'] = ivi.build_ieee_block(data) + b'\n'
+        # command split into several messages by the maximum message size
+        cmd = b'DATA?' + b' ' * 10000
+        self.vinst.responses[cmd] = b'long'
+        self.assertEqual(self.inst.ask_raw(cmd), b'long')
+        self.inst.write('DATA?')
+        self.assertEqual(self.inst.read_raw(2), b'#8')
+        buf = bytearray(8)
+        self.assertEqual(self.inst.read_into(buf), 8)
+        self.assertEqual(self.inst.read_raw(), data + b'\n')
+
+    def test_read_stb(self):
+        self.vinst.stb = 0x10
+        self.assertEqual(self.inst.read_stb(), 0x10)
+
+    def test_srq(self):
+        handled = list()
+        self.inst.srq_handler = handled.append
+        self.assertEqual(self.inst.wait_for_srq(0), None)
+        self.inst.write('SRQ')
+        self.assertEqual(self.inst.wait_for_srq(2), 0x40)
+        self.assertEqual(handled, [0x40])
+
+    def test_trigger_lock_remote(self):
+        self.inst.trigger()
+        self.inst.lock()
+        self.inst.unlock()
+        self.inst.remote()
+        self.inst.local()
+        self.vinst.responses[b'*IDN?'] = b'ID'
+        self.inst.ask_raw(b'*IDN?')
+        self.assertEqual(self.vinst.rx_log, ['trigger', b'*IDN?'])
+
+    def test_driver(self):
+        self.inst.close()
+        self.vinst.close()
+        self.vinst = VirtualHislipInstrument(overlapped=True)
+        self.vinst.responses[b'DATA?'] = b'#15ABCDE\n'
+        drv = ivi.Driver(self.vinst.resource)
+        self.inst = drv._interface
+        self.assertTrue(isinstance(self.inst, hislip.HislipInstrument))
+        drv._write('DATA?')
+        self.assertEqual(drv._read_ieee_block(), b'ABCDE')
+
+if __name__ == '__main__':
+    unittest.main()
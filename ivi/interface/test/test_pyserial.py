@@ -0,0 +1,184 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import os
+import select
+import sys
+import threading
+import time
+import unittest
+
+try:
+    import pty
+    import serial
+    from .. import pyserial
+except ImportError:
+    pyserial = None
+
+class VirtualSerialInstrument(object):
+    "Serial instrument stand-in on the master side of a pseudo terminal"
+    def __init__(self):
+        self.master, self.slave = pty.openpty()
+        self.port = os.ttyname(self.slave)
+        self.rx_log = list()
+        self.responses = dict()
+        # DSR handshake: DSR drops dsr_latency after each command is
+        # received and comes back busy_time later
+        self.dsr_latency = 0
+        self.busy_time = 0
+        self.busy_start = 0
+        self.busy_end = 0
+        self.running = True
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        buf = b''
+        while self.running:
+            r, w, x = select.select([self.master], [], [], 0.05)
+            if not r:
+                continue
+            try:
+                buf += os.read(self.master, 65536)
+            except OSError:
+                break
+            while b'\n' in buf:
+                cmd, buf = buf.split(b'\n', 1)
+                self.rx_log.append(cmd)
+                now = time.time()
+                self.busy_start = now + self.dsr_latency
+                self.busy_end = self.busy_start + self.busy_time
+                if cmd in self.responses:
+                    self.send(self.responses[cmd])
+
+    def send(self, data):
+        while data:
+            n = os.write(self.master, data)
+            data = data[n:]
+
+    def get_dsr(self):
+        now = time.time()
+        return not (self.busy_start <= now < self.busy_end)
+
+    def close(self):
+        self.running = False
+        self.thread.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+class DSRSerial(object):
+    "Serial port wrapper reading DSR from a VirtualSerialInstrument"
+    def __init__(self, serial, vinst):
+        self.__dict__['serial'] = serial
+        self.__dict__['vinst'] = vinst
+
+    def __getattr__(self, name):
+        return getattr(self.serial, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.serial, name, value)
+
+    @property
+    def dsr(self):
+        return self.vinst.get_dsr()
+
+
+@unittest.skipIf(pyserial is None or not sys.platform.startswith('linux'), "requires pyserial and pty")
+class TestSerialInstrument(unittest.TestCase):
+
+    def setUp(self):
+        self.vinst = VirtualSerialInstrument()
+        self.inst = pyserial.SerialInstrument(self.vinst.port, timeout=2)
+
+    def tearDown(self):
+        self.inst.serial.close()
+        self.vinst.close()
+
+    def test_ask(self):
+        self.vinst.responses[b'*IDN?'] = b'VIRTUAL,SERIAL,0,1.0\n'
+        self.assertEqual(self.inst.ask('*IDN?'), 'VIRTUAL,SERIAL,0,1.0')
+        self.assertEqual(self.vinst.rx_log, [b'*IDN?'])
+
+    def test_large_read(self):
+        data = bytes(bytearray(i % 10 + 48 for i in range(100000)))
+        self.vinst.responses[b'DATA?'] = data + b'\n'
+        self.assertEqual(self.inst.ask_raw(b'DATA?'), data + b'\n')
+
+    def test_carry_over(self):
+        # two messages arriving together are returned one at a time
+        self.vinst.responses[b'TWO?'] = b'first\nsecond\n'
+        self.assertEqual(self.inst.ask('TWO?'), 'first')
+        self.assertEqual(self.inst.read(), 'second')
+
+    def test_num(self):
+        self.vinst.responses[b'NUM?'] = b'0123456789\n'
+        self.inst.write('NUM?')
+        self.assertEqual(self.inst.read_raw(4), b'0123')
+        self.assertEqual(self.inst.read_raw(4), b'4567')
+        self.assertEqual(self.inst.read_raw(4), b'89\n')
+
+    def test_timeout(self):
+        self.inst.serial.timeout = 0.1
+        self.vinst.responses[b'PART?'] = b'partial'
+        self.assertEqual(self.inst.ask_raw(b'PART?'), b'partial')
+
+    def test_dsr_event(self):
+        self.vinst.dsr_latency = 0.002
+        self.vinst.busy_time = 0.02
+        self.inst.serial = DSRSerial(self.inst.serial, self.vinst)
+        self.inst.flow_control = 'dsr'
+        self.inst.message_delay = 0.1
+        for i in range(3):
+            start = time.time()
+            self.inst.write('CMD%d' % i)
+            self.assertTrue(time.time() >= self.vinst.busy_end)
+            self.assertTrue(time.time() - start < 0.1)
+        self.assertEqual(self.vinst.rx_log, [b'CMD0', b'CMD1', b'CMD2'])
+
+    def test_dsr_timeout(self):
+        self.vinst.busy_time = 10
+        self.inst.serial = DSRSerial(self.inst.serial, self.vinst)
+        self.inst.flow_control = 'dsr'
+        self.inst.message_delay = 0.1
+        self.inst.dsr_timeout = 0.2
+        self.assertRaises(IOError, self.inst.write, 'CMD')
+
+    def test_adaptive_delay(self):
+        self.vinst.dsr_latency = 0.002
+        self.vinst.busy_time = 0.005
+        self.inst.serial = DSRSerial(self.inst.serial, self.vinst)
+        self.inst.flow_control = 'dsr'
+        self.inst.message_delay = 0.1
+        self.inst.adaptive_delay = True
+        for i in range(10):
+            self.inst.write('CMD%d' % i)
+        self.assertTrue(self.inst.message_delay < 0.05)
+        self.assertTrue(self.inst.message_delay >= 0.002)
+        self.assertEqual(len(self.vinst.rx_log), 10)
+
+if __name__ == '__main__':
+    unittest.main()
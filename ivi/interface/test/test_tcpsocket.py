@@ -0,0 +1,142 @@
+"""
+
+Python Interchangeable Virtual Instrument Library
+
+Copyright (c) 2017 Alex Forencich
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+"""
+
+import socket
+import threading
+import unittest
+
+import ivi
+from .. import tcpsocket
+
+class VirtualSocketInstrument(object):
+    "Raw SCPI socket server stand-in"
+    def __init__(self, connections = 1):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.resource = 'TCPIP::127.0.0.1::%d::SOCKET' % self.port
+        self.connections = connections
+        self.conn = None
+        self.connected = threading.Event()
+        self.rx_log = list()
+        self.responses = dict()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        for i in range(self.connections):
+            try:
+                self.conn, addr = self.server.accept()
+            except socket.error:
+                break
+            self.connected.set()
+            buf = b''
+            while True:
+                try:
+                    data = self.conn.recv(65536)
+                except socket.error:
+                    break
+                if not data:
+                    break
+                buf += data
+                while b'\n' in buf:
+                    cmd, buf = buf.split(b'\n', 1)
+                    self.rx_log.append(cmd)
+                    if cmd in self.responses:
+                        self.conn.sendall(self.responses[cmd])
+            self.conn.close()
+
+    def drop(self):
+        "Drop the current connection"
+        self.connected.wait()
+        self.connected.clear()
+        self.conn.shutdown(socket.SHUT_RDWR)
+
+    def close(self):
+        self.server.close()
+
+
+class TestSocketInstrument(unittest.TestCase):
+
+    def setUp(self):
+        self.vinst = VirtualSocketInstrument()
+        self.inst = tcpsocket.SocketInstrument(self.vinst.resource, timeout=2)
+
+    def tearDown(self):
+        self.inst.close()
+        self.vinst.thread.join()
+        self.vinst.close()
+
+    def test_nodelay(self):
+        self.assertTrue(self.inst.socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY))
+
+    def test_ask(self):
+        self.vinst.responses[b'*IDN?'] = b'VIRTUAL,SOCKET,0,1.0\n'
+        self.assertEqual(self.inst.ask('*IDN?'), 'VIRTUAL,SOCKET,0,1.0')
+        self.assertEqual(self.vinst.rx_log, [b'*IDN?'])
+
+    def test_carry_over(self):
+        self.vinst.responses[b'TWO?'] = b'first\nsecond\n'
+        self.assertEqual(self.inst.ask('TWO?'), 'first')
+        self.assertEqual(self.inst.read(), 'second')
+
+    def test_num(self):
+        self.vinst.responses[b'NUM?'] = b'0123456789\n'
+        self.inst.write('NUM?')
+        self.assertEqual(self.inst.read_raw(4), b'0123')
+        self.assertEqual(self.inst.read_raw(), b'456789\n')
+
+    def test_read_ieee_block(self):
+        data = bytes(bytearray(i % 256 for i in range(1000000)))
+        self.vinst.responses[b'CURV?'] = ivi.build_ieee_block(data) + b'\n'
+        self.inst.write('CURV?')
+        self.assertEqual(self.inst.read_ieee_block(), data)
+        self.assertEqual(self.inst.read_raw(), b'\n')
+
+    def test_read_into(self):
+        self.vinst.responses[b'DATA?'] = b'0123456789\n'
+        self.inst.write('DATA?')
+        buf = bytearray(4)
+        self.assertEqual(self.inst.read_into(buf), 4)
+        self.assertEqual(buf, bytearray(b'0123'))
+        self.assertEqual(self.inst.read_raw(), b'456789\n')
+
+    def test_driver(self):
+        self.inst.close()
+        self.vinst.thread.join()
+        self.vinst.close()
+        self.vinst = VirtualSocketInstrument()
+        self.vinst.responses[b'DATA?'] = b'#15ABCDE\n'
+        drv = ivi.Driver(self.vinst.resource)
+        self.inst = drv._interface
+        self.assertTrue(isinstance(self.inst, tcpsocket.SocketInstrument))
+        drv._write('DATA?')
+        self.assertEqual(drv._read_ieee_block(), b'ABCDE')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -26,8 +26,13 @@ THE SOFTWARE.
 
 # import libraries
 import inspect
+import json
 import numpy as np
+import os
 import re
+import struct
+import time
+import zlib
 from functools import partial
 
 # try importing drivers
@@ -62,6 +67,18 @@ try:
 except ImportError:
     pass
 
+# raw TCP socket support
+try:
+    from .interface import tcpsocket
+except ImportError:
+    pass
+
+# HiSLIP support
+try:
+    from .interface import hislip
+except ImportError:
+    pass
+
 # set to True to try loading PyVISA first before
 # other interface libraries
 _prefer_pyvisa = False
@@ -421,22 +438,26 @@ class TraceY(object):
         self.y_raw = None
         self.y_hole = None
 
-    @property
-    def y(self):
-        y = np.array(self.y_raw)
+    def _scale_y(self, y):
+        y = np.asarray(y)
         yf = y.astype(float)
         if self.y_hole is not None:
             yf[y == self.y_hole] = float('nan')
         return ((yf - self.y_reference) * self.y_increment) + self.y_origin
 
+    @property
+    def y(self):
+        return self._scale_y(self.y_raw)
+
     def __getitem__(self, index):
+        if type(index) is slice:
+            return self._scale_y(self.y_raw[index])
         y = self.y_raw[index]
-        if y == self.y_hole:
-            y = float('nan')
+        y = float('nan') if y == self.y_hole else float(y)
         return ((y - self.y_reference) * self.y_increment) + self.y_origin
 
     def __iter__(self):
-        return (float('nan') if y == self.y_hole else ((y - self.y_reference) * self.y_increment + self.y_origin) for i, y in enumerate(self.y_raw))
+        return (float('nan') if y == self.y_hole else ((float(y) - self.y_reference) * self.y_increment + self.y_origin) for i, y in enumerate(self.y_raw))
 
     def __len__(self):
         return len(self.y_raw)
@@ -444,6 +465,119 @@ class TraceY(object):
     def count(self):
         return len(self.y_raw)
 
+    def _index_to_x(self, index):
+        return np.asarray(index, dtype=float)
+
+    def _raw_chunks(self, chunk_size):
+        # iterate over raw samples in chunks so that memory mapped traces
+        # are paged in a piece at a time; holes are returned as a mask
+        raw = np.asarray(self.y_raw)
+        for start in range(0, len(raw), chunk_size):
+            y = raw[start:start+chunk_size]
+            if self.y_hole is not None:
+                yield start, y, y == self.y_hole
+            else:
+                yield start, y, None
+
+    def decimate_min_max(self, n, chunk_size=1024*1024):
+        """
+        Decimate trace for display by taking the minimum and maximum sample
+        of n/2 equally sized buckets.  Returns x and y arrays of at most n
+        points, ordered by sample index.  Works on the raw samples, so only
+        the selected points are scaled.
+        """
+        count = len(self.y_raw)
+        buckets = max(int(n) // 2, 1)
+        size = max(-(-count // buckets), 1)
+        # whole buckets per chunk
+        chunk_size = max(chunk_size // size, 1) * size
+
+        idx = list()
+        for start, y, hole in self._raw_chunks(chunk_size):
+            pad = -len(y) % size
+            ymin = y
+            ymax = y
+            if hole is not None:
+                # ignore hole values when searching for extremes
+                ymin = np.where(hole, np.inf, y)
+                ymax = np.where(hole, -np.inf, y)
+            if pad:
+                ymin = np.concatenate((ymin, np.repeat(ymin[-1:], pad)))
+                ymax = np.concatenate((ymax, np.repeat(ymax[-1:], pad)))
+            offset = start + np.arange(0, len(ymin), size)
+            imin = offset + np.argmin(ymin.reshape(-1, size), axis=1)
+            imax = offset + np.argmax(ymax.reshape(-1, size), axis=1)
+            idx.append(np.sort(np.vstack((imin, imax)), axis=0).T.ravel())
+
+        if len(idx) == 0:
+            return np.zeros(0), np.zeros(0)
+
+        idx = np.concatenate(idx)
+        idx = idx[idx < count]
+        # drop duplicates from flat buckets
+        idx = idx[np.concatenate(([True], np.diff(idx) != 0))]
+
+        return self._index_to_x(idx), self._scale_y(np.asarray(self.y_raw)[idx])
+
+    def decimate_lttb(self, n, chunk_size=1024*1024):
+        """
+        Decimate trace for display with the largest triangle three buckets
+        algorithm.  Returns x and y arrays of at most n points, always
+        including the first and last sample.  The selection is made on the
+        raw samples, which gives the same result as on the scaled values.
+        """
+        count = len(self.y_raw)
+        n = int(n)
+        if n >= count or n < 3:
+            x = np.arange(count)
+            return self._index_to_x(x), self._scale_y(self.y_raw[0:count])
+
+        # bucket boundaries, first and last samples are their own buckets
+        edges = np.floor(np.linspace(1, count - 1, n - 1)).astype(np.intp)
+
+        # bucket averages of raw samples, computed chunk by chunk
+        sums = np.zeros(n - 2)
+        nums = np.zeros(n - 2)
+        for start, y, hole in self._raw_chunks(chunk_size):
+            pos = np.arange(start, start + len(y))
+            b = np.searchsorted(edges, pos, side='right') - 1
+            valid = (b >= 0) & (b < n - 2)
+            if hole is not None:
+                valid &= ~hole
+            sums += np.bincount(b[valid], weights=y[valid], minlength=n - 2)
+            nums += np.bincount(b[valid], minlength=n - 2)
+        avg_y = np.where(nums > 0, sums / np.maximum(nums, 1), np.nan)
+        avg_x = (edges[:-1] + edges[1:] - 1) / 2.0
+
+        raw = np.asarray(self.y_raw)
+        idx = np.zeros(n, dtype=np.intp)
+        idx[-1] = count - 1
+        ax = 0.0
+        ay = float(raw[0])
+        for i in range(n - 2):
+            a, b = edges[i], edges[i+1]
+            y = raw[a:b].astype(float)
+            if self.y_hole is not None:
+                y[raw[a:b] == self.y_hole] = np.nan
+            if i < n - 3:
+                cx, cy = avg_x[i+1], avg_y[i+1]
+            else:
+                cx, cy = float(count - 1), float(raw[count - 1])
+            if np.isnan(cy):
+                cy = ay
+            x = np.arange(a, b)
+            area = np.abs((ax - cx) * (y - ay) - (ax - x) * (cy - ay))
+            if np.all(np.isnan(area)):
+                j = 0
+            else:
+                j = np.nanargmax(area)
+            idx[i+1] = a + j
+            ax = float(a + j)
+            if not np.isnan(y[j]):
+                ay = y[j]
+
+        return self._index_to_x(idx), self._scale_y(raw[idx])
+
 
 class TraceYT(TraceY):
     "Y-T trace object"
@@ -461,14 +595,371 @@ class TraceYT(TraceY):
     def t(self):
         return self.x
 
+    def _index_to_x(self, index):
+        return ((np.asarray(index) - self.x_reference) * self.x_increment) + self.x_origin
+
     def __getitem__(self, index):
+        if type(index) is slice:
+            x = np.arange(*index.indices(len(self.y_raw)))
+            return (((x - self.x_reference) * self.x_increment) + self.x_origin, self._scale_y(self.y_raw[index]))
         y = self.y_raw[index]
-        if y == self.y_hole:
-            y = float('nan')
+        y = float('nan') if y == self.y_hole else float(y)
         return (((index - self.x_reference) * self.x_increment) + self.x_origin, ((y - self.y_reference) * self.y_increment) + self.y_origin)
 
     def __iter__(self):
-        return ((((i - self.x_reference) * self.x_increment) + self.x_origin, float('nan') if y == self.y_hole else ((y - self.y_reference) * self.y_increment) + self.y_origin) for i, y in enumerate(self.y_raw))
+        return ((((i - self.x_reference) * self.x_increment) + self.x_origin, float('nan') if y == self.y_hole else ((float(y) - self.y_reference) * self.y_increment) + self.y_origin) for i, y in enumerate(self.y_raw))
+
+
+class TraceAccumulator(object):
+    "Running mean, variance, minimum and maximum over repeated trace acquisitions"
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        "Discard all accumulated data"
+        self.count = 0
+        self._template = None
+        self._n = None
+        self._mean = None
+        self._m2 = None
+        self._min = None
+        self._max = None
+        self._x = None
+        self._delta = None
+
+    def add(self, trace):
+        """
+        Accumulate a TraceY or TraceYT object.  All traces must have the same
+        length.  Data is accumulated in float64 in the raw sample units of the
+        first trace; traces with different scaling are converted to those
+        units first.  Hole samples are excluded from the statistics of that
+        sample position.
+        """
+        raw = np.asarray(trace.y_raw)
+
+        if self._template is None:
+            self._template = new_trace_from_metadata(get_trace_metadata(trace))
+            self._template.y_hole = None
+            shape = raw.shape
+            self._n = np.zeros(shape, dtype=np.int64)
+            self._mean = np.zeros(shape)
+            self._m2 = np.zeros(shape)
+            self._min = np.full(shape, np.inf)
+            self._max = np.full(shape, -np.inf)
+            self._x = np.zeros(shape)
+            self._delta = np.zeros(shape)
+        elif raw.shape != self._mean.shape:
+            raise ValueError('Trace length does not match accumulated traces')
+
+        t = self._template
+        x = self._x
+        x[:] = raw
+        if (trace.y_increment != t.y_increment or trace.y_reference != t.y_reference or
+                trace.y_origin != t.y_origin):
+            # convert to raw units of the first trace
+            x -= trace.y_reference
+            x *= trace.y_increment / t.y_increment if t.y_increment else 0
+            x += t.y_reference + ((trace.y_origin - t.y_origin) / t.y_increment if t.y_increment else 0)
+
+        if trace.y_hole is not None:
+            valid = raw != trace.y_hole
+        else:
+            valid = None
+
+        # Welford's algorithm, updated in place
+        delta = self._delta
+        if valid is None:
+            self._n += 1
+            np.subtract(x, self._mean, out=delta)
+            self._mean += delta / self._n
+            np.subtract(x, self._mean, out=x)
+            delta *= x
+            self._m2 += delta
+            x += self._mean
+            np.minimum(self._min, x, out=self._min)
+            np.maximum(self._max, x, out=self._max)
+        else:
+            self._n += valid
+            np.subtract(x, self._mean, out=delta)
+            delta[~valid] = 0
+            self._mean += delta / np.maximum(self._n, 1)
+            x2 = x - self._mean
+            delta *= x2
+            self._m2 += delta
+            np.minimum(self._min, np.where(valid, x, np.inf), out=self._min)
+            np.maximum(self._max, np.where(valid, x, -np.inf), out=self._max)
+
+        self.count += 1
+
+    def _make_trace(self, y_raw):
+        trace = new_trace_from_metadata(get_trace_metadata(self._template))
+        trace.average_count = self.count
+        y_raw = y_raw.copy()
+        y_raw[self._n == 0] = float('nan')
+        trace.y_raw = y_raw
+        return trace
+
+    @property
+    def mean(self):
+        "Mean of accumulated traces as a trace object"
+        return self._make_trace(self._mean)
+
+    @property
+    def min(self):
+        "Minimum of accumulated traces as a trace object"
+        return self._make_trace(self._min)
+
+    @property
+    def max(self):
+        "Maximum of accumulated traces as a trace object"
+        return self._make_trace(self._max)
+
+    @property
+    def variance(self):
+        "Sample variance of accumulated traces in scaled units"
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = np.where(self._n > 1, self._m2 / np.maximum(self._n - 1, 1), float('nan'))
+        return var * self._template.y_increment**2
+
+    @property
+    def std(self):
+        "Sample standard deviation of accumulated traces in scaled units"
+        return np.sqrt(self.variance)
+
+
+TraceMetadata = {
+        'TraceY': ['average_count', 'y_increment', 'y_origin', 'y_reference', 'y_hole'],
+        'TraceYT': ['average_count', 'y_increment', 'y_origin', 'y_reference', 'y_hole',
+                'x_increment', 'x_origin', 'x_reference']}
+
+
+def get_trace_metadata(trace):
+    "Return the scaling metadata of a trace as a dict"
+    cls = 'TraceYT' if isinstance(trace, TraceYT) else 'TraceY'
+    d = dict(type=cls)
+    for k in TraceMetadata[cls]:
+        v = getattr(trace, k)
+        if isinstance(v, np.generic):
+            v = v.item()
+        d[k] = v
+    return d
+
+
+def new_trace_from_metadata(d):
+    "Create an empty trace object from a metadata dict"
+    if d.get('type', 'TraceYT') == 'TraceY':
+        trace = TraceY()
+    else:
+        trace = TraceYT()
+    for k in TraceMetadata[type(trace).__name__]:
+        if k in d:
+            setattr(trace, k, d[k])
+    return trace
+
+
+def memmap_trace(trace, filename, dtype, count=-1, offset=0):
+    "Back a trace with raw samples stored in a file and write the sidecar header"
+    # sidecar header is stored next to the data file as filename.hdr
+    dtype = np.dtype(dtype)
+    if count < 0:
+        count = (os.path.getsize(filename) - offset) // dtype.itemsize
+    hdr = get_trace_metadata(trace)
+    hdr['dtype'] = dtype.str
+    hdr['count'] = int(count)
+    hdr['offset'] = int(offset)
+    with open(filename + '.hdr', 'w') as f:
+        json.dump(hdr, f, indent=1, sort_keys=True)
+    if count > 0:
+        trace.y_raw = np.memmap(filename, dtype=dtype, mode='r', offset=offset, shape=(count,))
+    else:
+        trace.y_raw = np.zeros(0, dtype=dtype)
+    return trace
+
+
+def load_memmap_trace(filename, mode='r'):
+    "Open a trace stored with memmap_trace without reading the samples into memory"
+    with open(filename + '.hdr', 'r') as f:
+        hdr = json.load(f)
+    trace = new_trace_from_metadata(hdr)
+    dtype = np.dtype(str(hdr['dtype']))
+    if hdr['count'] > 0:
+        trace.y_raw = np.memmap(filename, dtype=dtype, mode=mode, offset=hdr['offset'], shape=(hdr['count'],))
+    else:
+        trace.y_raw = np.zeros(0, dtype=dtype)
+    return trace
+
+
+class TraceArchive(object):
+    "Trace archive file storing raw trace samples and scaling metadata"
+    # File layout (all values little endian):
+    #   header: magic 'IVITRACE'
+    #   data:   raw samples of each trace, each record aligned to 8 bytes
+    #   index:  one IndexDtype record per trace
+    #   footer: index offset (uint64), trace count (uint64), magic 'IVIINDEX'
+    # Appending overwrites the old index and footer with new sample data and
+    # writes the updated index on close().
+
+    Magic = b'IVITRACE'
+    IndexMagic = b'IVIINDEX'
+    IndexDtype = np.dtype([('offset', '<u8'), ('count', '<u8'), ('dtype', 'S4'),
+            ('type', 'u1'), ('average_count', '<i8'), ('y_increment', '<f8'),
+            ('y_origin', '<f8'), ('y_reference', '<f8'), ('y_hole', '<f8'),
+            ('x_increment', '<f8'), ('x_origin', '<f8'), ('x_reference', '<f8')])
+    Footer = struct.Struct('<QQ8s')
+
+    def __init__(self, filename, mode='r'):
+        if mode not in ('r', 'w', 'a'):
+            raise ValueError("mode must be 'r', 'w' or 'a'")
+        self.filename = filename
+        self.mode = mode
+        self._file = None
+        self._index = np.zeros(0, dtype=self.IndexDtype)
+        self._new = list()
+
+        if mode == 'w' or (mode == 'a' and not os.path.exists(filename)):
+            self._file = open(filename, 'w+b')
+            self._file.write(self.Magic)
+            self._data_end = len(self.Magic)
+            self._modified = True
+            return
+
+        with open(filename, 'rb') as f:
+            if f.read(len(self.Magic)) != self.Magic:
+                raise FileFormatException('Not a trace archive')
+            f.seek(-self.Footer.size, os.SEEK_END)
+            index_offset, count, magic = self.Footer.unpack(f.read(self.Footer.size))
+            if magic != self.IndexMagic:
+                raise FileFormatException('Trace archive index missing')
+        self._data_end = index_offset
+        self._modified = False
+
+        if count > 0:
+            self._index = np.memmap(filename, dtype=self.IndexDtype, mode='r',
+                    offset=index_offset, shape=(count,))
+
+        if mode == 'a':
+            # the index is about to be overwritten, so keep a copy in memory
+            self._index = np.array(self._index)
+            self._file = open(filename, 'r+b')
+
+    def _align(self):
+        pad = -self._data_end % 8
+        if pad:
+            self._file.seek(self._data_end)
+            self._file.write(b'\0' * pad)
+            self._data_end += pad
+
+    def append(self, trace):
+        "Append a trace to the archive and return its index"
+        if self._file is None:
+            raise IOError('Trace archive not open for writing')
+        y = np.asarray(trace.y_raw)
+        self._align()
+
+        entry = np.zeros(1, dtype=self.IndexDtype)[0]
+        entry['offset'] = self._data_end
+        entry['count'] = len(y)
+        entry['dtype'] = y.dtype.str.encode('ascii')
+        entry['type'] = 1 if isinstance(trace, TraceYT) else 0
+        entry['y_hole'] = float('nan')
+        d = get_trace_metadata(trace)
+        for k in d:
+            if k != 'type' and d[k] is not None:
+                entry[k] = d[k]
+
+        self._file.seek(self._data_end)
+        self._file.write(y.tobytes())
+        self._data_end += y.nbytes
+        self._new.append(entry)
+        self._modified = True
+        return len(self) - 1
+
+    def extend(self, traces):
+        "Append several traces to the archive"
+        for trace in traces:
+            self.append(trace)
+
+    def flush(self):
+        "Write the index so that the archive is complete on disk"
+        if self._file is None or not self._modified:
+            return
+        if len(self._new):
+            self._index = np.concatenate((np.asarray(self._index), np.array(self._new, dtype=self.IndexDtype)))
+            self._new = list()
+        self._align()
+        self._file.seek(self._data_end)
+        self._file.write(self._index.tobytes())
+        self._file.write(self.Footer.pack(self._data_end, len(self._index), self.IndexMagic))
+        self._file.truncate()
+        self._file.flush()
+        self._modified = False
+
+    def close(self):
+        "Write the index and close the archive"
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+    def _get_entry(self, index):
+        n = len(self._index)
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError('trace index out of range')
+        if index < n:
+            return self._index[index]
+        return self._new[index - n]
+
+    def __getitem__(self, index):
+        if type(index) is slice:
+            return [self[i] for i in range(*index.indices(len(self)))]
+        entry = self._get_entry(index)
+        if self._file is not None:
+            self._file.flush()
+
+        d = dict(type='TraceYT' if entry['type'] else 'TraceY')
+        for k in TraceMetadata[d['type']]:
+            d[k] = entry[k].item()
+        d['average_count'] = int(d['average_count'])
+        for k in ('y_reference', 'x_reference', 'y_hole'):
+            if k in d and float(d[k]).is_integer():
+                d[k] = int(d[k])
+        if np.isnan(d['y_hole']):
+            d['y_hole'] = None
+        trace = new_trace_from_metadata(d)
+
+        dtype = np.dtype(entry['dtype'].decode('ascii'))
+        count = int(entry['count'])
+        if count > 0:
+            trace.y_raw = np.memmap(self.filename, dtype=dtype, mode='r',
+                    offset=int(entry['offset']), shape=(count,))
+        else:
+            trace.y_raw = np.zeros(0, dtype=dtype)
+        return trace
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __len__(self):
+        return len(self._index) + len(self._new)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def save_traces(filename, traces, append=False):
+    "Store a list of traces in a trace archive file"
+    with TraceArchive(filename, 'a' if append else 'w') as archive:
+        archive.extend(traces)
+
+
+def load_traces(filename):
+    "Open a trace archive file for lazy, random access reading"
+    return TraceArchive(filename, 'r')
 
 
 def add_attribute(obj, name, attr, doc = None):
@@ -773,6 +1264,58 @@ def list_resources():
     return res
 
 
+RECONNECT_ERRORS = (IOError, OSError, EOFError)
+
+class ReconnectInterface(object):
+    "Interface wrapper that reconnects the driver after I/O errors"
+    # methods that can be repeated after reconnecting
+    retry_methods = set(['write_raw', 'write', 'ask_raw', 'ask', 'read_stb',
+            'trigger', 'clear', 'remote', 'local', 'lock', 'unlock'])
+    message_methods = set(['write_raw', 'write', 'ask_raw', 'ask'])
+
+    def __init__(self, driver, interface):
+        self.driver = driver
+        self.interface = interface
+
+    def __getattr__(self, name):
+        attr = getattr(self.interface, name)
+        if not callable(attr) or name == 'close':
+            return attr
+        return partial(self.call, name)
+
+    def call(self, name, *args):
+        driver = self.driver
+        try:
+            if not driver._reconnecting and name in self.message_methods:
+                self.check_setup(args[0])
+            return getattr(self.interface, name)(*args)
+        except RECONNECT_ERRORS:
+            if driver._reconnecting:
+                raise
+            driver._reconnect()
+            if name not in self.retry_methods:
+                # response is lost
+                raise
+            return getattr(driver._interface.interface, name)(*args)
+
+    def check_setup(self, data):
+        # commands mark the setup checksum as stale; it is refreshed before
+        # the next query so that it is current when the connection drops
+        if isinstance(data, (list, tuple)):
+            query = any('?' in str(d) for d in data)
+            command = any('?' not in str(d) for d in data)
+        elif isinstance(data, bytes):
+            query = b'?' in data
+            command = not query
+        else:
+            query = '?' in str(data)
+            command = not query
+        if command:
+            self.driver._setup_checksum_stale = True
+        elif query and self.driver._setup_checksum_stale:
+            self.driver._update_setup_checksum()
+
+
 class DriverOperation(IviContainer):
     "Inherent IVI methods for driver operation"
     
@@ -1576,7 +2119,7 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         # process out args for initialize
         kw = {}
         for k in ('range_check', 'query_instr_status', 'cache', 'simulate', 'record_coercions',
-                'interchange_check', 'driver_setup', 'prefer_pyvisa'):
+                'interchange_check', 'driver_setup', 'prefer_pyvisa', 'reconnect'):
             if k in kwargs:
                 kw[k] = kwargs.pop(k)
         
@@ -1585,6 +2128,15 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         self.__dict__.setdefault('_instrument_id', '')
         self._cache_valid = dict()
         
+        # reconnect policy: number of attempts (0 to disable), initial delay
+        # and maximum delay between attempts in seconds
+        self._reconnect_attempts = 0
+        self._reconnect_delay = 0.5
+        self._reconnect_max_delay = 10
+        self._reconnecting = False
+        self._setup_checksum = None
+        self._setup_checksum_stale = False
+        
         super(Driver, self).__init__(*args, **kwargs)
         
         self._add_method('initialize',
@@ -1800,6 +2352,10 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
                 self._driver_operation_driver_setup = val
             elif op == 'prefer_pyvisa':
                 self._prefer_pyvisa = bool(val)
+            elif op == 'reconnect':
+                if val is True:
+                    val = 5
+                self._reconnect_attempts = int(val)
             else:
                 raise UnknownOptionException('Invalid option')
 
@@ -1809,99 +2365,7 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         elif resource is None:
             raise IOException('No resource specified!')
         elif type(resource) == str:
-            # parse VISA resource string
-            # valid resource strings:
-            # TCPIP::10.0.0.1::INSTR
-            # TCPIP0::10.0.0.1::INSTR
-            # TCPIP::10.0.0.1::gpib,5::INSTR
-            # TCPIP0::10.0.0.1::gpib,5::INSTR
-            # TCPIP0::10.0.0.1::usb0::INSTR
-            # TCPIP0::10.0.0.1::usb0[1234::5678::MYSERIAL::0]::INSTR
-            # USB::1234::5678::INSTR
-            # USB::1234::5678::SERIAL::INSTR
-            # USB0::0x1234::0x5678::INSTR
-            # USB0::0x1234::0x5678::SERIAL::INSTR
-            # USB0::0x1234::0x5678::SERIAL::0::INSTR
-            # GPIB::10::INSTR
-            # GPIB0::10::INSTR
-            # ASRL1::INSTR
-            # ASRL::COM1,9600,8n1::INSTR
-            # ASRL::/dev/ttyUSB0,9600::INSTR
-            # ASRL::/dev/ttyUSB0,9600,8n1::INSTR
-            m = re.match('^(?P<prefix>(?P<type>TCPIP|USB|GPIB|ASRL)\d*)(::(?P<arg1>[^\s:]+))?(::(?P<arg2>[^\s:]+(\[.+\])?))?(::(?P<arg3>[^\s:]+))?(::(?P<arg4>[^\s:]+))?(::(?P<suffix>INSTR))$', resource, re.I)
-            if m is None:
-                if 'pyvisa' in globals():
-                    # connect with PyVISA
-                    self._interface = pyvisa.PyVisaInstrument(resource)
-                else:
-                    raise IOException('Invalid resource string')
-            else:
-                res_type = m.group('type').upper()
-                res_prefix = m.group('prefix')
-                res_arg1 = m.group('arg1')
-                res_arg2 = m.group('arg2')
-                res_arg3 = m.group('arg3')
-                res_suffix = m.group('suffix')
-
-                if res_type == 'TCPIP':
-                    # TCP connection
-                    if self._prefer_pyvisa and 'pyvisa' in globals():
-                        # connect with PyVISA
-                        self._interface = pyvisa.PyVisaInstrument(resource)
-                    elif 'vxi11' in globals():
-                        # connect with VXI-11
-                        self._interface = vxi11.Instrument(resource)
-                    elif 'pyvisa' in globals():
-                        # connect with PyVISA
-                        self._interface = pyvisa.PyVisaInstrument(resource)
-                    else:
-                        raise IOException('Cannot use resource type %s' % res_type)
-                elif res_type == 'USB':
-                    # USB connection
-                    if self._prefer_pyvisa and 'pyvisa' in globals():
-                        # connect with PyVISA
-                        self._interface = pyvisa.PyVisaInstrument(resource)
-                    elif 'usbtmc' in globals():
-                        # connect with USBTMC
-                        self._interface = usbtmc.Instrument(resource)
-                    elif 'pyvisa' in globals():
-                        # connect with PyVISA
-                        self._interface = pyvisa.PyVisaInstrument(resource)
-                    else:
-                        raise IOException('Cannot use resource type %s' % res_type)
-                elif res_type == 'GPIB':
-                    # GPIB connection
-                    if self._prefer_pyvisa and 'pyvisa' in globals():
-                        # connect with PyVISA
-                        self._interface = pyvisa.PyVisaInstrument(resource)
-                    elif 'linuxgpib' in globals():
-                        # connect with linux-gpib
-                        self._interface = linuxgpib.LinuxGpibInstrument(resource)
-                    elif 'pyvisa' in globals():
-                        # connect with PyVISA
-                        self._interface = pyvisa.PyVisaInstrument(resource)
-                    else:
-                        raise IOException('Cannot use resource type %s' % res_type)
-                elif res_type == 'ASRL':
-                    # Serial connection
-                    if self._prefer_pyvisa and 'pyvisa' in globals():
-                        # connect with PyVISA
-                        self._interface = pyvisa.PyVisaInstrument(resource)
-                    elif 'pyserial' in globals():
-                        # connect with PySerial
-                        self._interface = pyserial.SerialInstrument(resource)
-                    elif 'pyvisa' in globals():
-                        # connect with PyVISA
-                        self._interface = pyvisa.PyVisaInstrument(resource)
-                    else:
-                        raise IOException('Cannot use resource type %s' % res_type)
-
-                elif 'pyvisa' in globals():
-                    # connect with PyVISA
-                    self._interface = pyvisa.PyVisaInstrument(resource)
-                else:
-                    raise IOException('Unknown resource type %s' % res_type)
-
+            self._open_resource(resource)
             self._driver_operation_io_resource_descriptor = resource
 
         elif 'vxi11' in globals() and resource.__class__ == vxi11.Instrument:
@@ -1919,9 +2383,143 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
 
         self.driver_operation.invalidate_all_attributes()
 
+        if self._reconnect_attempts > 0 and type(resource) == str and \
+                not self._driver_operation_simulate:
+            self._interface = ReconnectInterface(self, self._interface)
+            self._setup_checksum = None
+            self._setup_checksum_stale = True
+
         self._initialized = True
 
 
+    def _open_resource(self, resource):
+        "Opens the interface for a VISA resource string"
+        # parse VISA resource string
+        # valid resource strings:
+        # TCPIP::10.0.0.1::INSTR
+        # TCPIP0::10.0.0.1::INSTR
+        # TCPIP::10.0.0.1::gpib,5::INSTR
+        # TCPIP0::10.0.0.1::gpib,5::INSTR
+        # TCPIP0::10.0.0.1::usb0::INSTR
+        # TCPIP0::10.0.0.1::usb0[1234::5678::MYSERIAL::0]::INSTR
+        # TCPIP::10.0.0.1::hislip0::INSTR
+        # TCPIP0::10.0.0.1::hislip0,4880::INSTR
+        # TCPIP::10.0.0.1::5025::SOCKET
+        # TCPIP0::10.0.0.1::5025::SOCKET
+        # USB::1234::5678::INSTR
+        # USB::1234::5678::SERIAL::INSTR
+        # USB0::0x1234::0x5678::INSTR
+        # USB0::0x1234::0x5678::SERIAL::INSTR
+        # USB0::0x1234::0x5678::SERIAL::0::INSTR
+        # GPIB::10::INSTR
+        # GPIB0::10::INSTR
+        # ASRL1::INSTR
+        # ASRL::COM1,9600,8n1::INSTR
+        # ASRL::/dev/ttyUSB0,9600::INSTR
+        # ASRL::/dev/ttyUSB0,9600,8n1::INSTR
+        m = re.match('^(?P<prefix>(?P<type>TCPIP|USB|GPIB|ASRL)\d*)(::(?P<arg1>[^\s:]+))?(::(?P<arg2>[^\s:]+(\[.+\])?))?(::(?P<arg3>[^\s:]+))?(::(?P<arg4>[^\s:]+))?(::(?P<suffix>INSTR|SOCKET))$', resource, re.I)
+        if m is None:
+            if 'pyvisa' in globals():
+                # connect with PyVISA
+                self._interface = pyvisa.PyVisaInstrument(resource)
+            else:
+                raise IOException('Invalid resource string')
+        else:
+            res_type = m.group('type').upper()
+            res_prefix = m.group('prefix')
+            res_arg1 = m.group('arg1')
+            res_arg2 = m.group('arg2')
+            res_arg3 = m.group('arg3')
+            res_suffix = m.group('suffix').upper()
+
+            if res_type == 'TCPIP' and res_suffix == 'SOCKET':
+                # raw TCP socket connection
+                if self._prefer_pyvisa and 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                elif 'tcpsocket' in globals():
+                    # connect with raw socket
+                    self._interface = tcpsocket.SocketInstrument(resource)
+                elif 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                else:
+                    raise IOException('Cannot use resource type %s' % res_type)
+            elif res_suffix == 'SOCKET':
+                raise IOException('Invalid resource string')
+            elif res_type == 'TCPIP' and res_arg2 is not None and res_arg2.lower().startswith('hislip'):
+                # HiSLIP connection
+                if self._prefer_pyvisa and 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                elif 'hislip' in globals():
+                    # connect with HiSLIP
+                    self._interface = hislip.HislipInstrument(resource)
+                elif 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                else:
+                    raise IOException('Cannot use resource type %s' % res_type)
+            elif res_type == 'TCPIP':
+                # TCP connection
+                if self._prefer_pyvisa and 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                elif 'vxi11' in globals():
+                    # connect with VXI-11
+                    self._interface = vxi11.Instrument(resource)
+                elif 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                else:
+                    raise IOException('Cannot use resource type %s' % res_type)
+            elif res_type == 'USB':
+                # USB connection
+                if self._prefer_pyvisa and 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                elif 'usbtmc' in globals():
+                    # connect with USBTMC
+                    self._interface = usbtmc.Instrument(resource)
+                elif 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                else:
+                    raise IOException('Cannot use resource type %s' % res_type)
+            elif res_type == 'GPIB':
+                # GPIB connection
+                if self._prefer_pyvisa and 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                elif 'linuxgpib' in globals():
+                    # connect with linux-gpib
+                    self._interface = linuxgpib.LinuxGpibInstrument(resource)
+                elif 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                else:
+                    raise IOException('Cannot use resource type %s' % res_type)
+            elif res_type == 'ASRL':
+                # Serial connection
+                if self._prefer_pyvisa and 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                elif 'pyserial' in globals():
+                    # connect with PySerial
+                    self._interface = pyserial.SerialInstrument(resource)
+                elif 'pyvisa' in globals():
+                    # connect with PyVISA
+                    self._interface = pyvisa.PyVisaInstrument(resource)
+                else:
+                    raise IOException('Cannot use resource type %s' % res_type)
+
+            elif 'pyvisa' in globals():
+                # connect with PyVISA
+                self._interface = pyvisa.PyVisaInstrument(resource)
+            else:
+                raise IOException('Unknown resource type %s' % res_type)
+
+
     def _close(self):
         "Closes an IVI session"
         if self._interface:
@@ -1934,6 +2532,62 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         self._initialized = False
 
 
+    def _reconnect(self):
+        "Re-opens the I/O session after a connection failure"
+        self._reconnecting = True
+        try:
+            try:
+                self._interface.interface.close()
+            except:
+                pass
+
+            delay = self._reconnect_delay
+            attempt = 0
+            while True:
+                try:
+                    self._open_resource(self._driver_operation_io_resource_descriptor)
+                    break
+                except RECONNECT_ERRORS + (IOException,):
+                    attempt += 1
+                    if attempt >= self._reconnect_attempts:
+                        self._interface = None
+                        self._initialized = False
+                        raise IOException('Reconnect failed')
+                    time.sleep(delay)
+                    delay = min(delay * 2, self._reconnect_max_delay)
+
+            self._interface = ReconnectInterface(self, self._interface)
+            self._reconnect_init()
+
+            # keep the attribute cache if the instrument setup has not
+            # changed while the connection was down
+            checksum = self._get_setup_checksum()
+            if checksum is None or self._setup_checksum_stale or checksum != self._setup_checksum:
+                self.driver_operation.invalidate_all_attributes()
+            self._setup_checksum = checksum
+            self._setup_checksum_stale = False
+        finally:
+            self._reconnecting = False
+
+    def _reconnect_init(self):
+        "Minimal initialization after reconnecting"
+        pass
+
+    def _get_setup_checksum(self):
+        "Returns a checksum of the instrument setup, or None if not supported"
+        try:
+            return zlib.crc32(self._system_fetch_setup()) & 0xffffffff
+        except (AttributeError, NotImplementedError, IviException):
+            return None
+
+    def _update_setup_checksum(self):
+        self._reconnecting = True
+        try:
+            self._setup_checksum = self._get_setup_checksum()
+            self._setup_checksum_stale = False
+        finally:
+            self._reconnecting = False
+
     def _get_initialized(self):
         "Returnes initialization state of driver"
         return self._initialized
@@ -2055,7 +2709,37 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
 
             self._write(data, encoding)
             return self._read(num, encoding)
-    
+
+    def _ask_pipelined(self, data, encoding = 'utf-8'):
+        "Write a list of queries, then read all of the responses in order"
+        if self._driver_operation_simulate:
+            print("[simulating] Ask pipelined (%s) '%s'" % (encoding, data))
+            return ['']*len(data)
+        if not self._initialized or self._interface is None:
+            raise NotInitializedException()
+
+        # interfaces set pipeline_mode to 'overlapped' if several queries can
+        # be in flight at once or to 'join' if queries should be sent as a
+        # single program message
+        mode = getattr(self._interface, 'pipeline_mode', None)
+
+        if mode == 'overlapped':
+            for data_i in data:
+                self._write(data_i, encoding)
+            return [self._read(-1, encoding) for data_i in data]
+
+        if mode == 'join' and len(data) > 1:
+            # queries without a leading colon would be relative to the
+            # previous header in a compound message
+            msg = ';'.join(d if d[:1] in (':', '*') else ':' + d for d in data)
+            val = self._ask(msg, -1, encoding).split(';')
+            if len(val) == len(data):
+                return val
+            # responses contain separators, so they cannot be split;
+            # repeat the queries one at a time
+
+        return [self._ask(data_i, -1, encoding) for data_i in data]
+
     def _ask_for_values(self, msg, delim=',', converter=float, array=True):
         '''
         write then read a list or array of data
@@ -2136,6 +2820,11 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
         # length of the data
         # ex: #800002000 prefixes 2000 data bytes
 
+        if not self._driver_operation_simulate and self._initialized and \
+                hasattr(self._interface, 'read_ieee_block'):
+            # interface can read the block in fewer transactions
+            return self._interface.read_ieee_block()
+
         ch = self._read_raw(1)
 
         if len(ch) == 0:
@@ -2152,7 +2841,37 @@ class Driver(DriverOperation, DriverIdentity, DriverUtility):
             raw_data = self._read_raw()
 
         return raw_data
-    
+
+    def _read_ieee_block_into(self, f, chunk_size = 1024*1024):
+        "Read IEEE block and write the payload to a file object in chunks"
+        # same framing as _read_ieee_block, but the payload is never held
+        # in memory in its entirety; returns the number of bytes written
+
+        ch = self._read_raw(1)
+
+        if len(ch) == 0:
+            return 0
+
+        while ch != b'#':
+            ch = self._read_raw(1)
+
+        l = int(self._read_raw(1))
+        if l > 0:
+            num = int(self._read_raw(l))
+            count = 0
+            while count < num:
+                data = self._read_raw(min(chunk_size, num - count))
+                if len(data) == 0:
+                    break
+                f.write(data)
+                count += len(data)
+        else:
+            data = self._read_raw()
+            f.write(data)
+            count = len(data)
+
+        return count
+
     def _ask_for_ieee_block(self, data, encoding = 'utf-8'):
         "Write string then read IEEE block"
         self._write(data, encoding)
@@ -25,6 +25,7 @@ THE SOFTWARE.
 """
 
 import array
+import numpy as np
 import sys
 import time
 
@@ -167,7 +168,8 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
                          scope.WaveformMeasurement, scope.MinMaxWaveform,
                          scope.ContinuousAcquisition, scope.AverageAcquisition,
                          scope.TriggerModifier, scope.AutoSetup,
-                         extra.common.Screenshot,
+                         extra.common.Screenshot, extra.scope.MemmapWaveform,
+                         extra.scope.HostWaveformMeasurement,
                          ivi.Driver):
     "Tektronix generic IVI oscilloscope driver"
 
@@ -1261,18 +1263,14 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
     def _set_trigger_ac_line_slope(self, value):
         self._set_trigger_edge_slope(value)
 
-    def _measurement_fetch_waveform(self, index):
-        index = ivi.get_index(self._channel_name, index)
-
-        if self._driver_operation_simulate:
-            return ivi.TraceYT()
-
+    def _setup_waveform_transfer(self, index):
         self._write(":data:source %s" % self._channel_name[index])
         self._write(":data:encdg fastest")
         self._write(":data:width 2")
         self._write(":data:start 1")
         self._write(":data:stop 1e10")
 
+    def _read_waveform_preamble(self):
         trace = ivi.TraceYT()
 
         # Read preamble
@@ -1292,37 +1290,74 @@ class tektronixBaseScope(scpi.common.IdnCommand, scpi.common.Reset, scpi.common.
         trace.y_origin = float(pre[16])
 
         if acq_format != 'Y':
-            raise UnexpectedResponseException()
+            raise ivi.UnexpectedResponseException()
 
         if point_enc != 'BINARY':
-            raise UnexpectedResponseException()
-
-        # Read waveform data
-        raw_data = self._ask_for_ieee_block(":curve?")
-        self._read_raw() # flush buffer
+            raise ivi.UnexpectedResponseException()
 
-        # Store in trace object
         if point_fmt == 'RP' and point_size == 1:
-            trace.y_raw = array.array('B', raw_data[0:points*2])
+            dtype = 'u1'
         elif point_fmt == 'RP' and point_size == 2:
-            trace.y_raw = array.array('H', raw_data[0:points*2])
+            dtype = 'u2'
         elif point_fmt == 'RI' and point_size == 1:
-            trace.y_raw = array.array('b', raw_data[0:points*2])
+            dtype = 'i1'
         elif point_fmt == 'RI' and point_size == 2:
-            trace.y_raw = array.array('h', raw_data[0:points*2])
+            dtype = 'i2'
         elif point_fmt == 'FP' and point_size == 4:
             trace.y_increment = 1
             trace.y_reference = 0
             trace.y_origin = 0
-            trace.y_raw = array.array('f', raw_data[0:points*4])
+            dtype = 'f4'
+        else:
+            raise ivi.UnexpectedResponseException()
+
+        if byte_order == 'LSB':
+            dtype = np.dtype('<' + dtype)
         else:
-            raise UnexpectedResponseException()
+            dtype = np.dtype('>' + dtype)
+
+        return trace, points, dtype
+
+    def _measurement_fetch_waveform(self, index):
+        index = ivi.get_index(self._channel_name, index)
+
+        if self._driver_operation_simulate:
+            return ivi.TraceYT()
+
+        self._setup_waveform_transfer(index)
+
+        trace, points, dtype = self._read_waveform_preamble()
+
+        # Read waveform data
+        raw_data = self._ask_for_ieee_block(":curve?")
+        self._read_raw() # flush buffer
 
-        if (byte_order == 'LSB') != (sys.byteorder == 'little'):
+        # Store in trace object
+        trace.y_raw = array.array(dtype.char, raw_data[0:points*dtype.itemsize])
+
+        if not dtype.isnative:
             trace.y_raw.byteswap()
 
         return trace
 
+    def _measurement_fetch_waveform_memmap(self, index, filename):
+        index = ivi.get_index(self._channel_name, index)
+
+        if self._driver_operation_simulate:
+            return ivi.TraceYT()
+
+        self._setup_waveform_transfer(index)
+
+        trace, points, dtype = self._read_waveform_preamble()
+
+        # Stream waveform data to file
+        self._write(":curve?")
+        with open(filename, 'wb') as f:
+            num = self._read_ieee_block_into(f)
+        self._read_raw() # flush buffer
+
+        return ivi.memmap_trace(trace, filename, dtype, min(points, num // dtype.itemsize))
+
     def _measurement_read_waveform(self, index, maximum_time):
         return self._measurement_fetch_waveform(index)
 
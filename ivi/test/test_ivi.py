@@ -24,9 +24,16 @@ THE SOFTWARE.
 
 """
 
+import io
+import os
+import shutil
+import tempfile
 import unittest
 
+import numpy as np
+
 import ivi
+from ivi.interface.test.test_tcpsocket import VirtualSocketInstrument
 
 class TestIndex(unittest.TestCase):
 
@@ -57,5 +64,213 @@ class TestIndex(unittest.TestCase):
         self.assertRaises(ivi.SelectorRangeException, ivi.get_index, self.index_dict, 100);
         self.assertRaises(ivi.SelectorNameException, ivi.get_index, self.index_dict, 'bad_item');
 
+class TestTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.trace = ivi.TraceYT()
+        self.trace.x_increment = 1e-9
+        self.trace.x_origin = -5e-6
+        self.trace.y_increment = 0.01
+        self.trace.y_reference = 32768
+        self.trace.y_hole = 0
+        self.trace.y_raw = np.arange(1000, 5000, dtype='uint16')
+        self.trace.y_raw[10] = 0
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_slice(self):
+        x, y = self.trace[5:20]
+        self.assertTrue(np.allclose(x, self.trace.x[5:20]))
+        self.assertTrue(np.allclose(y, self.trace.y[5:20], equal_nan=True))
+        self.assertTrue(np.isnan(y[5]))
+
+    def test_decimate_min_max(self):
+        x, y = self.trace.decimate_min_max(100)
+        self.assertEqual(len(x), 100)
+        self.assertTrue(np.all(np.diff(x) > 0))
+        # hole at index 10 is skipped
+        self.assertAlmostEqual(np.min(y), self.trace[0][1])
+        self.assertAlmostEqual(np.max(y), self.trace[-1][1])
+
+    def test_decimate_lttb(self):
+        x, y = self.trace.decimate_lttb(100, chunk_size=1000)
+        self.assertEqual(len(x), 100)
+        self.assertAlmostEqual(x[0], self.trace.x[0])
+        self.assertAlmostEqual(x[-1], self.trace.x[-1])
+        self.assertFalse(np.any(np.isnan(y)))
+
+    def test_accumulator(self):
+        acc = ivi.TraceAccumulator()
+        traces = list()
+        rs = np.random.RandomState(0)
+        for i in range(20):
+            trace = ivi.TraceYT()
+            trace.x_increment = self.trace.x_increment
+            trace.x_origin = self.trace.x_origin
+            trace.y_increment = 0.01 * (1 + i % 2)
+            trace.y_reference = 100
+            trace.y_hole = 0
+            trace.y_raw = rs.randint(1, 1000, 500).astype('uint16')
+            trace.y_raw[i] = 0
+            traces.append(trace)
+            acc.add(trace)
+        y = np.array([t.y for t in traces])
+        self.assertEqual(acc.count, 20)
+        self.assertEqual(acc.mean.average_count, 20)
+        self.assertTrue(np.allclose(acc.mean.x, traces[0].x))
+        self.assertTrue(np.allclose(acc.mean.y, np.nanmean(y, axis=0)))
+        self.assertTrue(np.allclose(acc.variance, np.nanvar(y, axis=0, ddof=1)))
+        self.assertTrue(np.allclose(acc.min.y, np.nanmin(y, axis=0)))
+        self.assertTrue(np.allclose(acc.max.y, np.nanmax(y, axis=0)))
+        self.assertRaises(ValueError, acc.add, self.trace)
+
+    def test_memmap_trace(self):
+        filename = os.path.join(self.tmpdir, 'trace.bin')
+        self.trace.y_raw.tofile(filename)
+        trace = ivi.memmap_trace(self.trace, filename, 'uint16')
+        self.assertTrue(isinstance(trace.y_raw, np.memmap))
+        loaded = ivi.load_memmap_trace(filename)
+        self.assertTrue(isinstance(loaded.y_raw, np.memmap))
+        self.assertEqual(len(loaded), 4000)
+        self.assertEqual(loaded.y_hole, 0)
+        self.assertTrue(np.allclose(loaded.x, trace.x))
+        self.assertTrue(np.allclose(loaded.y, trace.y, equal_nan=True))
+        del trace, loaded
+
+    def test_trace_archive(self):
+        filename = os.path.join(self.tmpdir, 'traces.ivt')
+        ivi.save_traces(filename, [self.trace, self.trace])
+        trace = ivi.TraceY()
+        trace.y_increment = 1
+        trace.y_raw = np.arange(10, dtype='int8')
+        ivi.save_traces(filename, [trace], append=True)
+        archive = ivi.load_traces(filename)
+        self.assertEqual(len(archive), 3)
+        self.assertTrue(isinstance(archive[1], ivi.TraceYT))
+        self.assertTrue(isinstance(archive[2], ivi.TraceY))
+        self.assertEqual(archive[0].y_raw.dtype, np.dtype('uint16'))
+        self.assertEqual(archive[2].y_hole, None)
+        self.assertTrue(np.allclose(archive[1].x, self.trace.x))
+        self.assertTrue(np.allclose(archive[1].y, self.trace.y, equal_nan=True))
+        self.assertTrue(np.allclose(archive[-1].y, trace.y))
+        del archive
+
+
+class BufferInstrument(object):
+    def __init__(self, data=b''):
+        self.read_buffer = io.BytesIO(data)
+        self.reads = 0
+
+    def write_raw(self, data):
+        pass
+
+    def read_raw(self, num=-1):
+        self.reads += 1
+        return self.read_buffer.read(num)
+
+
+class BlockInstrument(BufferInstrument):
+    write_raw = BufferInstrument.write_raw
+    read_raw = BufferInstrument.read_raw
+
+    def read_ieee_block(self):
+        self.reads += 1
+        return ivi.decode_ieee_block(self.read_buffer.read())
+
+
+class QueryInstrument(object):
+    def __init__(self, pipeline_mode=None):
+        if pipeline_mode is not None:
+            self.pipeline_mode = pipeline_mode
+        self.responses = {':a?': '1', ':b?': '2;3', ':c?': '4', 'c?': '4'}
+        self.tx_log = list()
+        self.output = list()
+
+    def write_raw(self, data):
+        data = data.decode('utf-8')
+        self.tx_log.append(data)
+        # responses to compound queries are joined with semicolons
+        self.output.append(';'.join(self.responses[q] for q in data.split(';')))
+
+    def read_raw(self, num=-1):
+        return self.output.pop(0).encode('utf-8')
+
+
+class TestDriverIO(unittest.TestCase):
+
+    def test_read_ieee_block(self):
+        inst = BufferInstrument(ivi.build_ieee_block(b'0123456789') + b'\n')
+        drv = ivi.Driver(inst)
+        self.assertEqual(drv._read_ieee_block(), b'0123456789')
+
+    def test_read_ieee_block_interface(self):
+        inst = BlockInstrument(ivi.build_ieee_block(b'0123456789') + b'\n')
+        drv = ivi.Driver(inst)
+        self.assertEqual(drv._read_ieee_block(), b'0123456789')
+        self.assertEqual(inst.reads, 1)
+
+    def test_ask_pipelined(self):
+        for mode in (None, 'join', 'overlapped'):
+            inst = QueryInstrument(mode)
+            drv = ivi.Driver(inst)
+            self.assertEqual(drv._ask_pipelined([':a?', 'c?']), ['1', '4'])
+            if mode == 'join':
+                self.assertEqual(inst.tx_log, [':a?;:c?'])
+            else:
+                self.assertEqual(inst.tx_log, [':a?', 'c?'])
+
+    def test_ask_pipelined_fallback(self):
+        # responses containing separators are queried again one at a time
+        inst = QueryInstrument('join')
+        drv = ivi.Driver(inst)
+        self.assertEqual(drv._ask_pipelined([':a?', ':b?']), ['1', '2;3'])
+        self.assertEqual(inst.tx_log, [':a?;:b?', ':a?', ':b?'])
+
+
+class SetupDriver(ivi.Driver):
+    def _system_fetch_setup(self):
+        return self._ask_raw(b':system:setup?')
+
+
+class TestReconnect(unittest.TestCase):
+
+    def setUp(self):
+        self.vinst = VirtualSocketInstrument(connections=3)
+        self.vinst.responses[b'*IDN?'] = b'ID\n'
+        self.vinst.responses[b':system:setup?'] = b'A\n'
+        self.drv = SetupDriver(self.vinst.resource, reconnect=3)
+        self.drv._reconnect_delay = 0.01
+
+    def tearDown(self):
+        self.drv._close()
+        self.vinst.close()
+
+    def test_reconnect(self):
+        drv = self.drv
+        drv._write(':config 1')
+        drv._set_cache_valid(True, 'config')
+        self.assertEqual(drv._ask('*IDN?'), 'ID')
+
+        # setup unchanged, cache kept
+        self.vinst.drop()
+        self.assertEqual(drv._ask('*IDN?'), 'ID')
+        self.assertTrue(drv._get_cache_valid('config'))
+
+        # setup changed, cache invalidated
+        self.vinst.responses[b':system:setup?'] = b'B\n'
+        self.vinst.drop()
+        self.assertEqual(drv._ask('*IDN?'), 'ID')
+        self.assertFalse(drv._get_cache_valid('config'))
+        self.assertEqual(self.vinst.rx_log.count(b':system:setup?'), 3)
+
+    def test_reconnect_failed(self):
+        self.vinst.close()
+        self.vinst.drop()
+        self.assertRaises(ivi.IOException, self.drv._ask, '*IDN?')
+        self.assertFalse(self.drv._initialized)
+
+
 if __name__ == '__main__':
     unittest.main()